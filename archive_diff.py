@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare zip releases by their central directories.
+
+Only the central directory of each archive is read: member names, sizes
+and CRC-32 values decide what was added, removed or modified. Members are
+decompressed only for --content, and only where the CRCs differ.
+
+Usage:
+    python archive_diff.py OLD.zip NEW.zip [--content] [--strip-prefix DIR/]
+    python archive_diff.py --matrix A.zip B.zip C.zip ...
+"""
+import sys
+import time
+import difflib
+import zipfile
+import argparse
+from collections import namedtuple
+
+CentralEntry = namedtuple('CentralEntry', ['size', 'crc', 'info'])
+
+def read_central_directory(path, strip_prefixes=()):
+    """Return {member name: CentralEntry} for the files in the zip at path."""
+    try:
+        with zipfile.ZipFile(path, 'r') as zipf:
+            infos = zipf.infolist()
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Error: Cannot read '{path}': {e}")
+        sys.exit(1)
+    members = {}
+    for info in infos:
+        if info.is_dir():
+            continue
+        name = info.filename
+        for prefix in strip_prefixes:
+            if name.startswith(prefix):
+                name = name[len(prefix):]
+                break
+        members[name] = CentralEntry(info.file_size, info.CRC, info)
+    return members
+
+def diff_directories(old, new):
+    """Return (added, removed, modified) name lists between two central directories."""
+    added = sorted(name for name in new if name not in old)
+    removed = sorted(name for name in old if name not in new)
+    modified = sorted(name for name in new if name in old
+                      and (old[name].size, old[name].crc) != (new[name].size, new[name].crc))
+    return added, removed, modified
+
+def content_diff(old_zip, new_zip, old_entry, new_entry, name):
+    """Return unified diff lines for one modified member, decompressing just it."""
+    old_data = old_zip.read(old_entry.info)
+    new_data = new_zip.read(new_entry.info)
+    try:
+        old_lines = old_data.decode('utf-8').splitlines(keepends=True)
+        new_lines = new_data.decode('utf-8').splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return [f"Binary member {name} differs ({len(old_data)} -> {len(new_data)} bytes)\n"]
+    return list(difflib.unified_diff(old_lines, new_lines, f"a/{name}", f"b/{name}"))
+
+def print_diff(old_path, new_path, show_content=False, strip_prefixes=()):
+    """Print the differences between two archives; return True if they match."""
+    old = read_central_directory(old_path, strip_prefixes)
+    new = read_central_directory(new_path, strip_prefixes)
+    added, removed, modified = diff_directories(old, new)
+    for name in added:
+        print(f"A {name}")
+    for name in removed:
+        print(f"D {name}")
+    for name in modified:
+        print(f"M {name}")
+    if show_content and modified:
+        with zipfile.ZipFile(old_path, 'r') as old_zip, zipfile.ZipFile(new_path, 'r') as new_zip:
+            for name in modified:
+                sys.stdout.writelines(content_diff(old_zip, new_zip, old[name], new[name], name))
+    print(f"\n{len(added)} added, {len(removed)} removed, {len(modified)} modified, "
+          f"{len(new) - len(added) - len(modified)} unchanged")
+    return not (added or removed or modified)
+
+def print_matrix(paths, strip_prefixes=()):
+    """Compare every pair of archives, reading each central directory once."""
+    started = time.time()
+    directories = [read_central_directory(path, strip_prefixes) for path in paths]
+    identical = 0
+    for i in range(len(paths)):
+        for j in range(i + 1, len(paths)):
+            added, removed, modified = diff_directories(directories[i], directories[j])
+            if not (added or removed or modified):
+                identical += 1
+                print(f"{paths[i]} == {paths[j]}")
+            else:
+                print(f"{paths[i]} -> {paths[j]}: +{len(added)} -{len(removed)} ~{len(modified)}")
+    pairs = len(paths) * (len(paths) - 1) // 2
+    print(f"\n{pairs} pairs compared, {identical} identical, in {time.time() - started:.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff zip archives using their central directories.")
+    parser.add_argument('archives', nargs='+', help="OLD NEW, or any number with --matrix")
+    parser.add_argument('--content', action='store_true',
+                        help="show a unified diff of each modified member")
+    parser.add_argument('--matrix', action='store_true', help="compare every pair of archives")
+    parser.add_argument('--strip-prefix', action='append', default=[], metavar='PREFIX',
+                        help="remove PREFIX from member names before comparing (repeatable)")
+    args = parser.parse_args()
+
+    if args.matrix:
+        print_matrix(args.archives, args.strip_prefix)
+        return
+    if len(args.archives) != 2:
+        parser.error("expected exactly two archives (or --matrix)")
+    if not print_diff(args.archives[0], args.archives[1], args.content, args.strip_prefix):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1287 @@
+#!/usr/bin/env python3
+"""
+Archive engine shared by the Gabriel Family Clinic packaging scripts.
+
+Each archive is described by a profile (which paths to include, which file
+types to keep, which ignore files to honour). The source tree is walked once
+with os.scandir and ignored directories such as node_modules and .next are
+pruned before they are entered, so only the files that ship are touched.
+
+OUTPUT may be '-' to stream the archive to stdout (progress goes to stderr),
+e.g. python archive_engine.py build full - --format tar.gz | docker build -
+
+Usage:
+    python archive_engine.py build PROFILE OUTPUT [--root DIR] [--prefix DIR/] [--format FMT]
+    python archive_engine.py build PROFILE OUTPUT.zip --volume-size 25M [--jobs N]
+    python archive_engine.py update PROFILE OUTPUT [--root DIR] [--prefix DIR/]
+    python archive_engine.py list PROFILE [--root DIR]
+    python archive_engine.py estimate PROFILE [--root DIR] [--limit SIZE]
+    python archive_engine.py bench PROFILE [--root DIR] [--jobs N]
+    python archive_engine.py verify ARCHIVE [--profile P --root DIR | --manifest JSON] [--jobs N]
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import copy
+import gzip
+import stat
+import zlib
+import hashlib
+import functools
+import struct
+import tarfile
+import zipfile
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from archive_utils import (ARCHIVE_FORMATS, COPY_CHUNK_SIZE, ZIP_EPOCH, archive_format_for,
+                           file_sha256, open_output)
+from near_duplicates import duplicate_paths
+from tree_walker import (DEFAULT_IGNORED_DIRS, IgnoreRules, expand_glob, has_glob_magic,
+                         walk_files)
+
+# Extensions kept by the source-only profile.
+SOURCE_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx', '.json', '.md', '.sql', '.yml', '.yaml')
+
+# Core application paths and configuration shipped by the essential profile.
+ESSENTIAL_ITEMS = [
+    'app',
+    'components',
+    'lib',
+    'design-system',
+    'public',
+    'supabase',
+    'tests',
+    'instrumentation.ts',
+    'package.json',
+    'next.config.js',
+    'tsconfig.json',
+    'tailwind.config.ts',
+    'postcss.config.mjs',
+    '.eslintrc.json',
+    '.gitignore',
+    'README.md',
+]
+
+# What create_fixed_archive.py ships: the app, the design system it imports
+# (@/design-system) and its build configuration, without tests or database.
+BUILD_FIXED_ITEMS = [
+    'app',
+    'components',
+    'lib',
+    'design-system',
+    'public',
+    'package.json',
+    'next.config.js',
+    'tsconfig.json',
+    'tailwind.config.ts',
+    'postcss.config.mjs',
+    'README.md',
+]
+
+# Deployment guides kept at the /workspace root next to the project. The
+# workspace archives ship them as Documentation/<name>, see DOCUMENTATION_ITEMS.
+WORKSPACE_DOCS = [
+    'Project_Architecture_Document.md',
+    'DEPLOYMENT-ERROR-RESOLUTION-REPORT.md',
+    'DOCKER-COMPLETE-PACKAGE.md',
+    'DOCKER-CONFIGURATION-SUMMARY.md',
+    'DOCKER-DEPLOYMENT-GUIDE.md',
+    'VERCEL-DEPLOYMENT-ERROR-FIX.md',
+    'VERCEL-FIX-DEPLOYMENT-GUIDE.md',
+]
+DOCUMENTATION_ITEMS = [(name, 'Documentation/') for name in WORKSPACE_DOCS]
+
+# Build output, caches and OS litter that never belong in an archive.
+COMMON_EXCLUDES = [
+    'coverage/',
+    '.nyc_output/',
+    '__pycache__/',
+    '.pytest_cache/',
+    '*.pyc',
+    '*.log',
+    '*.tmp',
+    '.DS_Store',
+]
+
+# The whole-tree walk update_archive_final.py has always shipped: only these
+# directories are pruned and, as before, any path containing '.log', '.tmp'
+# or '.cache' is skipped. No ignore file or COMMON_EXCLUDES applies.
+BUILD_TREE_IGNORED_DIRS = ('node_modules', '.next', '.git')
+BUILD_TREE_EXCLUDES = ['*.log*', '*.tmp*', '*.cache*']
+
+PROFILES = {
+    'full': {
+        'description': "Everything in the project that git would track",
+        'include': ['.'],
+        'extensions': None,
+        'ignore_files': ('.gitignore',),
+    },
+    'source-only': {
+        'description': "Application source, database and docs, source file types only",
+        'include': ['app', 'components', 'lib', 'design-system', 'supabase', 'public', 'docs'],
+        'extensions': SOURCE_EXTENSIONS,
+        'ignore_files': ('.gitignore',),
+    },
+    'essential': {
+        'description': "Core application directories and configuration",
+        'include': ESSENTIAL_ITEMS,
+        'extensions': None,
+        'ignore_files': ('.gitignore',),
+    },
+    'build-fixed': {
+        'description': "The app and its build configuration only",
+        'include': BUILD_FIXED_ITEMS,
+        'extensions': None,
+        'ignore_files': ('.gitignore',),
+    },
+    'build-tree': {
+        'description': "The whole tree except node_modules, .next, .git and log/tmp/cache files",
+        'include': ['.'],
+        'extensions': None,
+        'ignore_files': (),
+        'ignored_dirs': BUILD_TREE_IGNORED_DIRS,
+        'excludes': BUILD_TREE_EXCLUDES,
+    },
+    'docs': {
+        'description': "Project documentation",
+        'include': ['*.md', 'Documentation', 'docs', 'user_input_files'],
+        'extensions': ('.md',),
+        'ignore_files': (),
+    },
+}
+
+# File classes and the deflate level each gets; None stores the member
+# uncompressed (ZIP_STORED) because deflating it saves next to nothing.
+COMPRESSION_LEVELS = {
+    'text': 9,
+    'binary': 6,
+    'compressed': None,
+    'high-entropy': None,
+}
+TEXT_EXTENSIONS = frozenset([
+    '.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs', '.json', '.md', '.mdx', '.sql', '.yml',
+    '.yaml', '.css', '.scss', '.html', '.svg', '.txt', '.xml', '.csv', '.sh', '.py',
+    '.toml', '.map', '.lock', '.env', '.example',
+])
+# Formats that are compressed already, stored when a sample confirms it.
+COMPRESSED_EXTENSIONS = frozenset([
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.woff', '.woff2',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.br', '.zst', '.mp3', '.mp4', '.webm',
+    '.pdf',
+])
+# Non-text files are stored when their leading bytes look random.
+ENTROPY_SAMPLE_SIZE = 8 * 1024
+ENTROPY_MIN_SAMPLE = 512
+ENTROPY_THRESHOLD = 7.5
+
+# estimate compresses the leading bytes of a few files of each type and
+# applies the resulting ratio to all files of that type.
+ESTIMATE_SAMPLE_FILES = 8
+ESTIMATE_SAMPLE_SIZE = 64 * 1024
+# Local header plus central directory record per member, excluding the
+# name (stored twice), and the end of central directory record.
+ZIP_MEMBER_OVERHEAD = 30 + 46
+ZIP_END_RECORD_SIZE = 22
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# tar.gz output: gzip level, and the block size each pool worker compresses
+# as an independent gzip member when --jobs is above 1.
+GZIP_LEVEL = 9
+GZIP_BLOCK_SIZE = 1024 * 1024
+
+# Compressed members larger than this are spilled to a temporary file, so
+# memory per member in flight stays bounded whatever the file size.
+MEMBER_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Volumes are packed to this share of the byte budget, leaving room for
+# the difference between predicted and actual compressed sizes.
+VOLUME_FILL = 0.95
+# Volume numbers are zero-padded to at least this many digits.
+VOLUME_DIGITS = 2
+
+# Timestamp of every member in reproducible mode unless SOURCE_DATE_EPOCH
+# is set: 1980-01-01 00:00:00 UTC, the earliest a zip can store.
+REPRODUCIBLE_EPOCH = 315532800
+
+# stat is the os.stat_result collected by scan_profile (None when not scanned).
+ArchiveEntry = namedtuple('ArchiveEntry', ['path', 'arcname', 'stat'], defaults=(None,))
+# data is a list of compressed chunks, or the path of a temporary file
+# holding them for members larger than MEMBER_SPOOL_SIZE (see MemberSpool).
+CompressedMember = namedtuple('CompressedMember', ['member_class', 'level', 'crc', 'size',
+                                                   'compress_size', 'data', 'seconds'])
+
+def get_profile(name):
+    """Return the profile called name, exiting with the known names if missing."""
+    if name not in PROFILES:
+        print(f"Error: Unknown profile '{name}'. Known profiles: {', '.join(sorted(PROFILES))}")
+        sys.exit(1)
+    return PROFILES[name]
+
+def load_profile_rules(root, profile):
+    """
+    Return the ignore rules for profile: its ignore files plus its excludes
+    (COMMON_EXCLUDES unless the profile names its own), pruning its
+    ignored_dirs (DEFAULT_IGNORED_DIRS unless given).
+    """
+    rules = IgnoreRules.from_files(root, profile['ignore_files'],
+                                   profile.get('ignored_dirs', DEFAULT_IGNORED_DIRS))
+    for pattern in profile.get('excludes', COMMON_EXCLUDES):
+        rules.add(pattern)
+    return rules
+
+def iter_profile_files(root, profile, arc_prefix='', exclude_paths=(), verbose=False):
+    """
+    Yield an ArchiveEntry for every file the profile ships from root.
+
+    One pruned walk per include item; items may be files, directories or
+    glob patterns relative to root. An item may also be an (item, prefix)
+    pair, whose prefix goes before the member names of the files it reaches
+    (after arc_prefix). Files reached twice are yielded once, and
+    exclude_paths (e.g. the archive being written) are never yielded.
+    """
+    rules = load_profile_rules(root, profile)
+    extensions = profile['extensions']
+    excluded = {os.path.abspath(path) for path in exclude_paths}
+    seen = set()
+    for item in profile['include']:
+        item_prefix = ''
+        if isinstance(item, tuple):
+            item, item_prefix = item
+        source_path = os.path.normpath(os.path.join(root, item))
+        if has_glob_magic(item):
+            paths = expand_glob(source_path, rules)
+        elif os.path.isdir(source_path):
+            paths = walk_files(source_path, rules)
+        elif os.path.isfile(source_path):
+            paths = [source_path]
+        else:
+            if verbose:
+                print(f"  Warning: {item} not found, skipping")
+            continue
+        for path in paths:
+            if extensions is not None and not path.endswith(extensions):
+                continue
+            arcname = arc_prefix + item_prefix + os.path.relpath(path, root).replace(os.sep, '/')
+            if arcname in seen or os.path.abspath(path) in excluded:
+                continue
+            seen.add(arcname)
+            yield ArchiveEntry(path, arcname)
+
+def scan_profile(root, profile, arc_prefix='', exclude_paths=(), verbose=False):
+    """
+    Return the profile's ArchiveEntry list with each file stat'ed exactly once.
+
+    The stat results are reused for sizes, zip headers, update checks and
+    estimates, so the tree is not walked or stat'ed a second time.
+    """
+    entries = []
+    for entry in iter_profile_files(root, profile, arc_prefix, exclude_paths, verbose):
+        try:
+            entries.append(entry._replace(stat=os.stat(entry.path)))
+        except OSError as e:
+            print(f"  Skipped: {entry.arcname} - {e}")
+    return entries
+
+def classify_member(path):
+    """
+    Return the compression class of path.
+
+    Text formats are recognised by extension. Everything else is judged by
+    the byte entropy of its first ENTROPY_SAMPLE_SIZE bytes: 'compressed'
+    when a known compressed format really looks random (an .ico holding a
+    raw bitmap does not), 'high-entropy' for other random-looking data and
+    'binary' for the rest.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return 'text'
+    with open(path, 'rb') as f:
+        sample = f.read(ENTROPY_SAMPLE_SIZE)
+    if len(sample) < ENTROPY_MIN_SAMPLE or byte_entropy(sample) < ENTROPY_THRESHOLD:
+        return 'binary'
+    if extension in COMPRESSED_EXTENSIONS:
+        return 'compressed'
+    return 'high-entropy'
+
+def byte_entropy(data):
+    """Return the Shannon entropy of data in bits per byte (0 to 8)."""
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+class MemberSpool:
+    """
+    Collect a member's compressed chunks in memory, moving them to a
+    temporary file once they pass MEMBER_SPOOL_SIZE. Only the file's path
+    crosses a process boundary, so pool workers can spill too.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.file = None
+
+    def write(self, data):
+        if not data:
+            return
+        self.size += len(data)
+        if self.file is None and self.size > MEMBER_SPOOL_SIZE:
+            self.file = tempfile.NamedTemporaryFile(prefix='archive-member-', delete=False)
+            self.file.writelines(self.parts)
+            self.parts = []
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self.parts.append(data)
+
+    def close(self):
+        """Return the member data: the list of chunks or the spill file's path."""
+        if self.file is None:
+            return self.parts
+        self.file.close()
+        return self.file.name
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            os.remove(self.file.name)
+
+def iter_member_data(member):
+    """Yield the compressed bytes of member, removing its spill file afterwards."""
+    if not isinstance(member.data, str):
+        yield from member.data
+        return
+    try:
+        with open(member.data, 'rb') as f:
+            yield from iter(lambda: f.read(COPY_CHUNK_SIZE), b'')
+    finally:
+        os.remove(member.data)
+
+def compress_member(path, compresslevel=None):
+    """
+    Classify and compress the file at path; runs in pool workers too.
+
+    The level comes from COMPRESSION_LEVELS for the file's class (None means
+    ZIP_STORED); compresslevel, when given, replaces every deflate level.
+    The file is read in COPY_CHUNK_SIZE chunks and large members are spilled
+    to disk, so memory does not grow with the file. Returns a
+    CompressedMember; pass it to write_compressed_member (or drain
+    iter_member_data) so a spill file is removed.
+    """
+    started = time.perf_counter()
+    member_class = classify_member(path)
+    level = COMPRESSION_LEVELS[member_class]
+    if level is not None and compresslevel is not None:
+        level = compresslevel
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15) if level is not None else None
+    crc = 0
+    size = 0
+    spool = MemberSpool()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                spool.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            spool.write(compressor.flush())
+    except BaseException:
+        spool.discard()
+        raise
+    return CompressedMember(member_class, level, crc, size, spool.size, spool.close(),
+                            time.perf_counter() - started)
+
+def iter_compressed_entries(entries, compresslevel=None, jobs=1):
+    """
+    Yield (entry, fetch) pairs in input order, where fetch() returns the
+    entry's CompressedMember. With jobs > 1 files are compressed by a
+    process pool that runs at most 2 * jobs files ahead.
+    """
+    if jobs <= 1:
+        for entry in entries:
+            yield entry, functools.partial(compress_member, entry.path, compresslevel)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for entry in entries:
+            future = executor.submit(compress_member, entry.path, compresslevel)
+            pending.append((entry, future.result))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+def write_compressed_member(zipf, entry, member, fixed_mtime=None):
+    """Append a member whose data was produced by compress_member."""
+    info = zip_info_for(entry, fixed_mtime)
+    info.compress_type = zipfile.ZIP_STORED if member.level is None else zipfile.ZIP_DEFLATED
+    info.CRC = member.crc
+    info.file_size = member.size
+    info.compress_size = member.compress_size
+    write_raw_member(zipf, info, iter_member_data(member))
+
+def new_class_stats():
+    return {member_class: {'files': 0, 'bytes': 0, 'compressed': 0, 'seconds': 0.0}
+            for member_class in COMPRESSION_LEVELS}
+
+def record_member(report, member):
+    stats = report['classes'][member.member_class]
+    stats['files'] += 1
+    stats['bytes'] += member.size
+    stats['compressed'] += member.compress_size
+    stats['seconds'] += member.seconds
+
+class CountingStream:
+    """Write-only wrapper that counts the bytes passed on to fileobj."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.size = 0
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+def write_zip_members(stream, entries, compresslevel, jobs, report, verbose, fixed_mtime=None):
+    # Every member's sizes are known before it is written, so the zip
+    # needs neither seeks nor data descriptors and streams to pipes as is.
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for entry, fetch in iter_compressed_entries(entries, compresslevel, jobs):
+            # Only a source that cannot be read is skipped; write errors on
+            # the output (ENOSPC, EPIPE) end the build.
+            try:
+                member = fetch()
+            except OSError as e:
+                print(f"  Skipped: {entry.arcname} - {e}")
+                continue
+            write_compressed_member(zipf, entry, member, fixed_mtime)
+            report['files'] += 1
+            report['bytes'] += member.size
+            record_member(report, member)
+            if verbose:
+                print(f"  Added: {entry.arcname} ({member.member_class})")
+
+def compress_gzip_block(data, mtime):
+    """Return data as one complete gzip member; runs in pool workers."""
+    return gzip.compress(data, GZIP_LEVEL, mtime=mtime)
+
+class ParallelGzipWriter:
+    """
+    Write-only gzip stream that compresses GZIP_BLOCK_SIZE blocks in a
+    process pool, pigz-style.
+
+    Every block becomes an independent gzip member and members are written
+    in order, so the output is a standard multi-member gzip that gzip -d
+    and tar xzf read as one stream. At most 2 * jobs blocks are in flight.
+    With jobs=1 blocks are compressed inline; the bytes written depend only
+    on the input, never on jobs. The underlying fileobj is not closed.
+    """
+
+    def __init__(self, fileobj, jobs, mtime=None):
+        self.fileobj = fileobj
+        self.jobs = jobs
+        self.mtime = mtime
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.emitted = False
+        self.executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= GZIP_BLOCK_SIZE:
+            self._submit(bytes(self.buffer[:GZIP_BLOCK_SIZE]))
+            del self.buffer[:GZIP_BLOCK_SIZE]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _submit(self, block):
+        self.emitted = True
+        if self.executor is None:
+            self.fileobj.write(compress_gzip_block(block, self.mtime))
+            return
+        self.pending.append(self.executor.submit(compress_gzip_block, block, self.mtime))
+        while len(self.pending) >= 2 * self.jobs:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        try:
+            # An empty input still needs one (empty) gzip member.
+            if self.buffer or not self.emitted:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+
+def write_tar_members(stream, entries, archive_format, report, verbose, fixed_mtime=None,
+                      jobs=1):
+    gzip_stream = None
+    if archive_format == 'tar.gz':
+        # Our own gzip layer, so the header mtime can be pinned to 0. The
+        # block format is used for every job count so the output is the same.
+        mtime = 0 if fixed_mtime is not None else None
+        gzip_stream = ParallelGzipWriter(stream, jobs, mtime)
+        stream = gzip_stream
+    try:
+        with tarfile.open(fileobj=stream, mode='w|') as tar:
+            for entry in entries:
+                try:
+                    info = tar.gettarinfo(entry.path, entry.arcname)
+                    f = open(entry.path, 'rb')
+                except OSError as e:
+                    print(f"  Skipped: {entry.arcname} - {e}")
+                    continue
+                if fixed_mtime is not None:
+                    info.mtime = fixed_mtime
+                    info.mode = normalized_mode(info.mode)
+                    info.uid = info.gid = 0
+                    info.uname = info.gname = ''
+                with f:
+                    tar.addfile(info, f)
+                report['files'] += 1
+                report['bytes'] += info.size
+                if verbose:
+                    print(f"  Added: {entry.arcname}")
+    finally:
+        if gzip_stream is not None:
+            gzip_stream.close()
+
+def drop_duplicate_entries(entries, dedupe=None, verbose=False):
+    """
+    Leave out duplicate documents (see near_duplicates.py), keeping one
+    representative per cluster. dedupe is None, 'exact' or 'near'.
+    """
+    if not dedupe:
+        return entries
+    dropped, saved, clusters = duplicate_paths([entry.path for entry in entries], dedupe)
+    if verbose:
+        for cluster in clusters:
+            for path in cluster.drop:
+                print(f"  Duplicate of {cluster.keep}: {path}")
+    print(f"Duplicate documents left out: {len(dropped)} ({saved / 1024:.1f} KB saved)")
+    return [entry for entry in entries if entry.path not in dropped]
+
+def build_archive(root, output, profile='full', arc_prefix='', compresslevel=None,
+                  verbose=False, jobs=1, archive_format=None, reproducible=False, dedupe=None,
+                  entries=None):
+    """
+    Write a zip or tar archive of root according to profile.
+
+    output is a path, '-' for stdout or a writable file object; nothing is
+    ever seeked, so pipes and sockets work. archive_format ('zip', 'tar' or
+    'tar.gz') defaults to the one implied by output's name, else zip.
+    arc_prefix is prepended to every member name (e.g. 'gabriel-family-clinic/').
+    Each zip member is stored or deflated according to its compression class
+    (see compress_member). With jobs > 1 zip members are compressed in a
+    process pool and written in walk order, giving the same archive bytes as
+    the serial path; a tar.gz is compressed in independent blocks by the
+    pool instead (see ParallelGzipWriter).
+
+    With reproducible=True identical trees give byte-identical archives:
+    members are sorted by name, every timestamp is reproducible_timestamp(),
+    permissions are normalised to 0644/0755 with no owner, and the gzip
+    header of a tar.gz carries no mtime. dedupe ('exact' or 'near') keeps
+    one document per duplicate cluster. entries, a scan_profile() result,
+    skips the tree walk. Returns a report dict with files, bytes,
+    archive_size, seconds and per-class statistics. When output is '-' the
+    progress messages and the report go to stderr.
+    """
+    if output == '-':
+        # The archive owns stdout.
+        with redirect_stdout(sys.stderr):
+            return _build_archive(root, output, profile, arc_prefix, compresslevel, verbose,
+                                  jobs, archive_format, reproducible, dedupe, entries)
+    return _build_archive(root, output, profile, arc_prefix, compresslevel, verbose, jobs,
+                          archive_format, reproducible, dedupe, entries)
+
+def _build_archive(root, output, profile, arc_prefix, compresslevel, verbose, jobs,
+                   archive_format, reproducible, dedupe, entries):
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if not os.path.isdir(root):
+        print(f"Error: Source directory '{root}' does not exist.")
+        sys.exit(1)
+    is_path = isinstance(output, str) and output != '-'
+    if archive_format is None:
+        archive_format = (archive_format_for(output) if isinstance(output, str) else None) or 'zip'
+
+    started = time.time()
+    report = {'files': 0, 'bytes': 0, 'classes': new_class_stats()}
+    if entries is None:
+        entries = scan_profile(root, profile, arc_prefix, [output] if is_path else [], verbose)
+    entries = list(drop_duplicate_entries(entries, dedupe, verbose))
+    fixed_mtime = None
+    if reproducible:
+        entries.sort(key=lambda entry: entry.arcname)
+        fixed_mtime = reproducible_timestamp()
+    # A file object passed in stays open for the caller.
+    owned = isinstance(output, str)
+    fileobj = open_output(output) if owned else output
+    stream = CountingStream(fileobj)
+    try:
+        if archive_format == 'zip':
+            write_zip_members(stream, entries, compresslevel, jobs, report, verbose, fixed_mtime)
+        else:
+            write_tar_members(stream, entries, archive_format, report, verbose, fixed_mtime, jobs)
+    finally:
+        if owned:
+            fileobj.close()
+        else:
+            fileobj.flush()
+
+    report['archive_size'] = stream.size
+    report['seconds'] = time.time() - started
+    print_report(output if isinstance(output, str) else '<stream>', report)
+    return report
+
+def reproducible_timestamp():
+    """
+    Return SOURCE_DATE_EPOCH when set (the reproducible-builds convention),
+    else 1980-01-01 UTC.
+    """
+    try:
+        return max(int(os.environ.get('SOURCE_DATE_EPOCH', REPRODUCIBLE_EPOCH)), REPRODUCIBLE_EPOCH)
+    except ValueError:
+        print("Error: SOURCE_DATE_EPOCH must be an integer timestamp.")
+        sys.exit(1)
+
+def normalized_mode(mode):
+    """Return 0755 for files with any execute bit, else 0644."""
+    return 0o755 if mode & 0o111 else 0o644
+
+def volume_paths(output, count):
+    """Return the volume file names for output: X.zip -> X.part01.zip, X.part02.zip, ..."""
+    base, extension = os.path.splitext(output)
+    width = max(VOLUME_DIGITS, len(str(count)))
+    return [f"{base}.part{index:0{width}d}{extension or '.zip'}" for index in range(1, count + 1)]
+
+def existing_volume_paths(output):
+    """Return the volume files of output left by any earlier run (X.partNN.zip only)."""
+    base, extension = os.path.splitext(output)
+    directory, name = os.path.split(base)
+    pattern = re.compile(re.escape(name) + r'\.part\d{%d,}' % VOLUME_DIGITS
+                         + re.escape(extension or '.zip'))
+    try:
+        names = os.listdir(directory or '.')
+    except OSError:
+        return []
+    return [os.path.join(directory, entry) for entry in sorted(names) if pattern.fullmatch(entry)]
+
+def pack_volumes(entries, budget, compresslevel=None):
+    """
+    Bin-pack entries into volumes of at most budget predicted bytes.
+
+    Sizes are predicted per file type from sampled compression ratios and
+    packed first-fit decreasing against VOLUME_FILL of the budget, leaving
+    room for prediction error. A file predicted larger than that gets a
+    volume of its own. Each volume lists its entries in walk order.
+    """
+    predicted = {}
+    for group in group_by_type(entries).values():
+        ratio = sample_group_ratio(group, compresslevel)
+        for entry in group:
+            predicted[entry.arcname] = predicted_member_size(entry, ratio)
+    capacity = int(budget * VOLUME_FILL) - ZIP_END_RECORD_SIZE
+    order = {entry.arcname: index for index, entry in enumerate(entries)}
+    volumes = []
+    free = []
+    for entry in sorted(entries, key=lambda entry: -predicted[entry.arcname]):
+        size = predicted[entry.arcname]
+        for index, space in enumerate(free):
+            if size <= space:
+                volumes[index].append(entry)
+                free[index] -= size
+                break
+        else:
+            volumes.append([entry])
+            free.append(capacity - size)
+    return [sorted(volume, key=lambda entry: order[entry.arcname]) for volume in volumes]
+
+def write_volume(path, entries, compresslevel=None, fixed_mtime=None):
+    """Write one self-contained zip volume; runs in pool workers. Returns its report."""
+    report = {'files': 0, 'bytes': 0, 'classes': new_class_stats()}
+    with open(path, 'wb') as f:
+        stream = CountingStream(f)
+        write_zip_members(stream, entries, compresslevel, 1, report, False, fixed_mtime)
+    report['archive_size'] = stream.size
+    return report
+
+def build_volumes(root, output, budget, profile='full', arc_prefix='', compresslevel=None,
+                  jobs=1, reproducible=False, dedupe=None, entries=None):
+    """
+    Split a profile across self-contained zip volumes of at most budget bytes.
+
+    Files are bin-packed by predicted compressed size (see pack_volumes) and
+    the volumes are written concurrently by jobs processes. Every volume is
+    an ordinary zip that can be extracted on its own. entries, a
+    scan_profile() result, skips the tree walk. Returns the list of
+    (path, report) pairs; volumes that ended up over budget are reported.
+    """
+    if not isinstance(output, str) or output == '-':
+        print("Error: Volumes are written as files; give a .zip path as output.")
+        sys.exit(1)
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if not os.path.isdir(root):
+        print(f"Error: Source directory '{root}' does not exist.")
+        sys.exit(1)
+
+    started = time.time()
+    # Volumes from an earlier run inside root must not be archived again.
+    previous = existing_volume_paths(output)
+    if entries is None:
+        entries = scan_profile(root, profile, arc_prefix, previous + [output])
+    else:
+        excluded = {os.path.abspath(path) for path in previous + [output]}
+        entries = [entry for entry in entries if os.path.abspath(entry.path) not in excluded]
+    entries = list(drop_duplicate_entries(entries, dedupe))
+    fixed_mtime = None
+    if reproducible:
+        entries.sort(key=lambda entry: entry.arcname)
+        fixed_mtime = reproducible_timestamp()
+    volumes = pack_volumes(entries, budget, compresslevel)
+    paths = volume_paths(output, len(volumes))
+
+    count = len(volumes)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            reports = list(executor.map(write_volume, paths, volumes, [compresslevel] * count,
+                                        [fixed_mtime] * count))
+    else:
+        reports = [write_volume(path, volume, compresslevel, fixed_mtime)
+                   for path, volume in zip(paths, volumes)]
+
+    for path in sorted(set(previous) - set(paths)):
+        # Left over from an earlier run that needed more volumes.
+        os.remove(path)
+        print(f"  Removed stale volume: {path}")
+
+    over_budget = 0
+    for path, report in zip(paths, reports):
+        note = ''
+        if report['archive_size'] > budget:
+            over_budget += 1
+            note = '  OVER BUDGET'
+        print(f"  {path}: {report['files']} files, "
+              f"{report['archive_size'] / (1024 * 1024):.2f} MB{note}")
+    total = {'files': sum(report['files'] for report in reports),
+             'bytes': sum(report['bytes'] for report in reports),
+             'archive_size': sum(report['archive_size'] for report in reports),
+             'seconds': time.time() - started,
+             'classes': new_class_stats()}
+    for report in reports:
+        for name, stats in report['classes'].items():
+            for key, value in stats.items():
+                total['classes'][name][key] += value
+    print_report(f"{count} volumes of at most {budget / (1024 * 1024):.2f} MB", total,
+                 "Volumes created")
+    if over_budget:
+        print(f"Warning: {over_budget} volume(s) exceed the budget; a single file larger "
+              f"than the budget cannot be split.")
+    return list(zip(paths, reports))
+
+def zip_info_for(entry, fixed_mtime=None):
+    """
+    Return the ZipInfo ZipInfo.from_file would build, from the scanned stat
+    if any. With fixed_mtime the date is fixed (in UTC), the permissions are
+    normalised and the creating system is always Unix.
+    """
+    if fixed_mtime is not None:
+        date_time = time.gmtime(fixed_mtime)[:6]
+        info = zipfile.ZipInfo(entry.arcname, date_time[:5] + (date_time[5] // 2 * 2,))
+        info.create_system = 3
+        info.external_attr = (stat.S_IFREG | normalized_mode(entry.stat.st_mode)) << 16
+        info.file_size = entry.stat.st_size
+        return info
+    if entry.stat is None:
+        return zipfile.ZipInfo.from_file(entry.path, entry.arcname)
+    info = zipfile.ZipInfo(entry.arcname, zip_date_time(entry.stat.st_mtime))
+    info.external_attr = (entry.stat.st_mode & 0xFFFF) << 16
+    info.file_size = entry.stat.st_size
+    return info
+
+def zip_date_time(mtime):
+    """Return the date_time a zip member records for mtime (2-second resolution)."""
+    date_time = time.localtime(max(mtime, ZIP_EPOCH))[:6]
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+def member_is_current(info, path, st):
+    """
+    Return True if the zip member info still holds the file at path.
+
+    A size mismatch decides without reading the file. Otherwise the CRC
+    decides: a zip mtime has a 2-second resolution, so an edit that keeps
+    the size and lands in the same interval would go unnoticed by it.
+    """
+    if info.file_size != st.st_size or info.flag_bits & zipfile._MASK_ENCRYPTED:
+        return False
+    return info.CRC == file_crc32(path)
+
+def read_raw_member(fp, info):
+    """Yield the compressed bytes of member info from the open archive fp."""
+    fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+    if header[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    fp.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], 1)
+    remaining = info.compress_size
+    while remaining:
+        chunk = fp.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+def write_raw_member(zipf, info, chunks):
+    """
+    Append an already-compressed member to zipf, which must be open for writing.
+
+    info supplies the name, date, CRC and sizes and must not be the ZipInfo
+    the chunks are being read through; chunks are written verbatim after a
+    fresh local header, so the data is never recompressed.
+    """
+    info.header_offset = zipf.fp.tell()
+    # Sizes go in the local header, so no data descriptor follows the data.
+    info.flag_bits &= ~zipfile._MASK_USE_DATA_DESCRIPTOR
+    zipf.fp.write(info.FileHeader())
+    for chunk in chunks:
+        zipf.fp.write(chunk)
+    zipf.filelist.append(info)
+    zipf.NameToInfo[info.filename] = info
+    zipf.start_dir = zipf.fp.tell()
+    zipf._didModify = True
+
+def update_archive(root, output, profile='full', arc_prefix='', compresslevel=None,
+                   verbose=False):
+    """
+    Bring an existing zip archive up to date with root without rebuilding it.
+
+    Members whose source is unchanged (same size and CRC) are copied through
+    as raw compressed bytes; only new or modified files are compressed
+    (following the same per-class policy as build_archive), and members
+    whose source is gone are dropped. The result is written next to output
+    and swapped in with os.replace. Falls back to build_archive when output
+    does not exist yet.
+    """
+    if not isinstance(output, str) or output == '-':
+        print("Error: update needs an archive file; use build to write to a stream.")
+        sys.exit(1)
+    if not os.path.exists(output):
+        return build_archive(root, output, profile, arc_prefix, compresslevel, verbose)
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if not os.path.isdir(root):
+        print(f"Error: Source directory '{root}' does not exist.")
+        sys.exit(1)
+
+    started = time.time()
+    temp_output = output + '.tmp'
+    report = {'files': 0, 'bytes': 0, 'copied': 0, 'compressed': 0, 'removed': 0,
+              'classes': new_class_stats()}
+    try:
+        with zipfile.ZipFile(output, 'r') as old, \
+                zipfile.ZipFile(temp_output, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            old_members = {info.filename: info for info in old.infolist()}
+            for entry in scan_profile(root, profile, arc_prefix, [output, temp_output], verbose):
+                st = entry.stat
+                info = old_members.pop(entry.arcname, None)
+                # Only reading the source may skip a file; write errors end the update.
+                try:
+                    current = info is not None and member_is_current(info, entry.path, st)
+                    member = None if current else compress_member(entry.path, compresslevel)
+                except OSError as e:
+                    print(f"  Skipped: {entry.arcname} - {e}")
+                    continue
+                if current:
+                    copied = copy.copy(info)
+                    copied.date_time = zip_date_time(st.st_mtime)
+                    write_raw_member(zipf, copied, read_raw_member(old.fp, info))
+                    report['copied'] += 1
+                else:
+                    write_compressed_member(zipf, entry, member)
+                    record_member(report, member)
+                    report['compressed'] += 1
+                    if verbose:
+                        print(f"  {'Updated' if info else 'Added'}: {entry.arcname}")
+                report['files'] += 1
+                report['bytes'] += st.st_size
+            report['removed'] = sum(1 for info in old_members.values() if not info.is_dir())
+            if verbose:
+                for name in sorted(old_members):
+                    print(f"  Removed: {name}")
+        os.replace(temp_output, output)
+    except BaseException:
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
+        raise
+
+    report['archive_size'] = os.path.getsize(output)
+    report['seconds'] = time.time() - started
+    print_report(output, report, "Archive updated")
+    print(f"Copied unchanged: {report['copied']}, recompressed: {report['compressed']}, "
+          f"removed: {report['removed']}")
+    return report
+
+def file_type(path):
+    """Return the lower-cased extension used to group files in estimates."""
+    return os.path.splitext(path)[1].lower() or '(none)'
+
+def sample_compression(path, compresslevel=None):
+    """Return (sampled bytes, compressed bytes) for the head of path under the policy."""
+    level = COMPRESSION_LEVELS[classify_member(path)]
+    if level is not None and compresslevel is not None:
+        level = compresslevel
+    with open(path, 'rb') as f:
+        sample = f.read(ESTIMATE_SAMPLE_SIZE)
+    if level is None:
+        return len(sample), len(sample)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return len(sample), len(compressor.compress(sample) + compressor.flush())
+
+def group_by_type(entries):
+    """Return {file type: [entries]} preserving the order of entries."""
+    groups = {}
+    for entry in entries:
+        groups.setdefault(file_type(entry.path), []).append(entry)
+    return groups
+
+def sample_group_ratio(group, compresslevel=None):
+    """Return the compression ratio sampled from up to ESTIMATE_SAMPLE_FILES spread over group."""
+    stride = max(1, len(group) // ESTIMATE_SAMPLE_FILES)
+    sampled = compressed = 0
+    for entry in group[::stride][:ESTIMATE_SAMPLE_FILES]:
+        try:
+            sample_size, sample_compressed = sample_compression(entry.path, compresslevel)
+        except OSError:
+            continue
+        sampled += sample_size
+        compressed += sample_compressed
+    return compressed / sampled if sampled else 1.0
+
+def predicted_member_size(entry, ratio):
+    """Return the bytes entry is expected to add to a zip at the given ratio."""
+    return (int(entry.stat.st_size * ratio) + ZIP_MEMBER_OVERHEAD
+            + 2 * len(entry.arcname.encode('utf-8')))
+
+def estimate_archive(root, profile='full', arc_prefix='', compresslevel=None, dedupe=None,
+                     entries=None):
+    """
+    Predict the zip size of a profile without compressing the whole tree.
+
+    Files are grouped by extension; up to ESTIMATE_SAMPLE_FILES files spread
+    over each group are sampled and the group's source bytes are scaled by
+    the sampled compression ratio, plus the zip's per-member overhead.
+    entries, a scan_profile() result, skips the tree walk. Returns a report
+    dict with files, bytes, estimate, seconds and types.
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if not os.path.isdir(root):
+        print(f"Error: Source directory '{root}' does not exist.")
+        sys.exit(1)
+
+    started = time.time()
+    if entries is None:
+        entries = scan_profile(root, profile, arc_prefix)
+    groups = group_by_type(drop_duplicate_entries(entries, dedupe))
+
+    report = {'files': 0, 'bytes': 0, 'estimate': ZIP_END_RECORD_SIZE, 'types': {}}
+    for name, group in groups.items():
+        ratio = sample_group_ratio(group, compresslevel)
+        size = sum(entry.stat.st_size for entry in group)
+        estimate = sum(predicted_member_size(entry, ratio) for entry in group)
+        report['types'][name] = {'files': len(group), 'bytes': size, 'ratio': ratio,
+                                 'estimate': estimate}
+        report['files'] += len(group)
+        report['bytes'] += size
+        report['estimate'] += estimate
+    report['seconds'] = time.time() - started
+    return report
+
+def print_estimate(report, limit=None):
+    """Print an estimate report; return False if it exceeds limit bytes."""
+    print(f"{'Type':<12} {'Files':>6} {'Source':>10} {'Ratio':>6} {'Estimate':>10}")
+    for name, stats in sorted(report['types'].items(), key=lambda item: -item[1]['bytes']):
+        print(f"{name:<12} {stats['files']:>6} {stats['bytes'] / 1024:>8.1f}KB "
+              f"{stats['ratio']:>6.2f} {stats['estimate'] / 1024:>8.1f}KB")
+    print(f"\nFiles: {report['files']}")
+    print(f"Source size: {report['bytes'] / (1024 * 1024):.2f} MB")
+    print(f"Estimated archive size: {report['estimate'] / (1024 * 1024):.2f} MB")
+    print(f"Time: {report['seconds']:.2f}s")
+    if limit is None:
+        return True
+    if report['estimate'] > limit:
+        print(f"Over the limit of {limit / (1024 * 1024):.2f} MB")
+        return False
+    print(f"Fits the limit of {limit / (1024 * 1024):.2f} MB")
+    return True
+
+def parse_size(text):
+    """Parse a byte count such as '500000', '25M' or '1.5G' (binary units)."""
+    text = text.strip().upper().rstrip('B')
+    multiplier = SIZE_SUFFIXES.get(text[-1:], 1)
+    if text[-1:] in SIZE_SUFFIXES:
+        text = text[:-1]
+    try:
+        return int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+def verify_members(archive_path, items):
+    """
+    Check a batch of members of archive_path; runs in pool workers too.
+
+    items are (name, source_path, sha256) tuples. Every member is read in
+    full so zipfile checks its CRC-32; a member is then 'stale' if it no
+    longer matches source_path (size and CRC) or the expected SHA-256.
+    Returns (name, status, bytes read) tuples.
+    """
+    results = []
+    with zipfile.ZipFile(archive_path, 'r') as zipf:
+        for name, source_path, expected_sha256 in items:
+            info = zipf.getinfo(name)
+            digest = hashlib.sha256() if expected_sha256 else None
+            size = 0
+            try:
+                with zipf.open(info) as member:
+                    for chunk in iter(lambda: member.read(COPY_CHUNK_SIZE), b''):
+                        size += len(chunk)
+                        if digest:
+                            digest.update(chunk)
+            except (zipfile.BadZipFile, zlib.error, EOFError, OSError) as e:
+                results.append((name, f"corrupt ({e})", size))
+                continue
+            status = 'ok'
+            if source_path is not None:
+                try:
+                    if (os.path.getsize(source_path) != info.file_size
+                            or file_crc32(source_path) != info.CRC):
+                        status = 'stale'
+                except OSError as e:
+                    status = f"unreadable source ({e})"
+            elif digest and digest.hexdigest() != expected_sha256:
+                status = 'stale'
+            results.append((name, status, size))
+    return results
+
+def verify_archive(archive_path, root=None, profile=None, arc_prefix='', manifest=None, jobs=1):
+    """
+    Verify every member's CRC and cross-check the archive against a source.
+
+    The source is either root read through profile, or a snapshot manifest
+    (snapshot_store.py) whose paths are prefixed with arc_prefix. Members
+    are checked by jobs worker processes in size-balanced batches.
+    Returns True when nothing is corrupt, stale, missing or extra.
+    """
+    started = time.time()
+    try:
+        with zipfile.ZipFile(archive_path, 'r') as zipf:
+            infos = [info for info in zipf.infolist() if not info.is_dir()]
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Error: Cannot read archive '{archive_path}': {e}")
+        return False
+
+    expected = None
+    if manifest is not None:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            expected = {arc_prefix + path: (None, entry['sha256'])
+                        for path, entry in json.load(f)['files'].items()}
+    elif profile is not None:
+        if isinstance(profile, str):
+            profile = get_profile(profile)
+        expected = {entry.arcname: (entry.path, None)
+                    for entry in scan_profile(root, profile, arc_prefix, [archive_path])}
+
+    names = {info.filename for info in infos}
+    items = []
+    # Largest first, dealt round-robin, so batches carry similar byte counts.
+    for info in sorted(infos, key=lambda info: -info.file_size):
+        source_path, sha256 = (expected or {}).get(info.filename, (None, None))
+        items.append((info.filename, source_path, sha256))
+    batch_count = max(1, min(len(items), jobs * 4))
+    batches = [items[i::batch_count] for i in range(batch_count)]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            batch_results = executor.map(verify_members, [archive_path] * batch_count, batches)
+            results = [result for batch in batch_results for result in batch]
+    else:
+        results = [result for batch in batches for result in verify_members(archive_path, batch)]
+
+    problems = sorted((name, status) for name, status, _ in results if status != 'ok')
+    if expected is not None:
+        problems += [(name, 'missing') for name in sorted(set(expected) - names)]
+        problems += [(name, 'extra') for name in sorted(names - set(expected))]
+    total_bytes = sum(size for _, _, size in results)
+    seconds = time.time() - started
+
+    for name, status in problems:
+        print(f"  {status}: {name}")
+    print(f"\nVerified: {archive_path}")
+    print(f"Members: {len(results)}, problems: {len(problems)}")
+    print(f"Checked: {total_bytes / (1024 * 1024):.2f} MB in {seconds:.2f}s "
+          f"({total_bytes / (1024 * 1024) / max(seconds, 1e-9):.1f} MB/s)")
+    print("Archive OK" if not problems else "Archive FAILED verification")
+    return not problems
+
+def bench_archive(root, profile, jobs, compresslevel=None):
+    """Build the profile serially and with jobs processes and compare time and bytes."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = []
+        for label, run_jobs in (('serial', 1), (f'{jobs} jobs', jobs)):
+            output = os.path.join(temp_dir, f'bench-{run_jobs}.zip')
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                report = build_archive(root, output, profile, compresslevel=compresslevel,
+                                       jobs=run_jobs)
+            results.append((label, report, file_sha256(output)))
+
+    (_, serial, serial_digest), (label, parallel, parallel_digest) = results
+    print(f"Files: {serial['files']}, source size: {serial['bytes'] / (1024 * 1024):.2f} MB")
+    print(f"serial:     {serial['seconds']:.2f}s")
+    print(f"{label + ':':<11} {parallel['seconds']:.2f}s "
+          f"({serial['seconds'] / max(parallel['seconds'], 1e-9):.2f}x)")
+    print(f"Identical output: {'yes' if serial_digest == parallel_digest else 'NO'}")
+
+def print_report(output, report, action="Archive created"):
+    print(f"\n{action}: {output}")
+    print(f"Files: {report['files']}")
+    print(f"Source size: {report['bytes'] / (1024 * 1024):.2f} MB")
+    print(f"Archive size: {report['archive_size'] / (1024 * 1024):.2f} MB")
+    print(f"Time: {report['seconds']:.2f}s")
+    print_class_report(report['classes'])
+
+def print_class_report(classes):
+    """Print files, time and bytes saved for each compression class that was used."""
+    rows = [(name, stats) for name, stats in classes.items() if stats['files']]
+    if not rows:
+        return
+    print(f"\n{'Class':<13} {'Files':>6} {'Level':>7} {'Time':>8} {'Source':>10} {'Saved':>10}")
+    for name, stats in rows:
+        level = COMPRESSION_LEVELS[name]
+        saved = stats['bytes'] - stats['compressed']
+        print(f"{name:<13} {stats['files']:>6} {'stored' if level is None else level:>7} "
+              f"{stats['seconds']:>7.2f}s {stats['bytes'] / 1024:>8.1f}KB {saved / 1024:>8.1f}KB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build project archives from named profiles.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="write a zip archive for a profile")
+    build.add_argument('profile', choices=sorted(PROFILES))
+    build.add_argument('output', help="archive path, or '-' for stdout")
+    build.add_argument('--format', choices=ARCHIVE_FORMATS, dest='archive_format',
+                       help="archive format (default: from OUTPUT's extension, else zip)")
+    build.add_argument('--root', default='.', help="project directory (default: .)")
+    build.add_argument('--prefix', default='', help="directory prefix for every member name")
+    build.add_argument('--level', type=int, help="deflate level for every deflated class "
+                                                 "(default: per-class policy)")
+    build.add_argument('-v', '--verbose', action='store_true', help="print every added file")
+    build.add_argument('-j', '--jobs', type=int, default=1,
+                       help="compress zip members, or tar.gz blocks, in N processes (default: 1)")
+    build.add_argument('--volume-size', type=parse_size, metavar='SIZE',
+                       help="split into self-contained zip volumes of at most SIZE (e.g. 25M), "
+                            "written concurrently with --jobs")
+    build.add_argument('--dedupe', choices=['exact', 'near'],
+                       help="keep one .md/.txt document per exact or near-duplicate cluster")
+    build.add_argument('--reproducible', action='store_true',
+                       help="byte-identical output for identical trees (sorted members, fixed "
+                            "timestamps from SOURCE_DATE_EPOCH or 1980, normalised permissions)")
+
+    update = commands.add_parser('update', help="refresh an existing zip, recompressing only changed files")
+    update.add_argument('profile', choices=sorted(PROFILES))
+    update.add_argument('output', help="archive path")
+    update.add_argument('--root', default='.', help="project directory (default: .)")
+    update.add_argument('--prefix', default='', help="directory prefix for every member name")
+    update.add_argument('--level', type=int, help="deflate level for every deflated class "
+                                                  "(default: per-class policy)")
+    update.add_argument('-v', '--verbose', action='store_true', help="print every changed file")
+
+    listing = commands.add_parser('list', help="print the files a profile would ship")
+    listing.add_argument('profile', choices=sorted(PROFILES))
+    listing.add_argument('--root', default='.', help="project directory (default: .)")
+
+    verify = commands.add_parser('verify', help="check member CRCs against the source or a manifest")
+    verify.add_argument('archive')
+    verify.add_argument('--profile', choices=sorted(PROFILES),
+                        help="cross-check against this profile's files under --root")
+    verify.add_argument('--root', default='.', help="project directory (default: .)")
+    verify.add_argument('--prefix', default='', help="directory prefix of every member name")
+    verify.add_argument('--manifest', help="cross-check against a snapshot manifest instead")
+    verify.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count)")
+
+    estimate = commands.add_parser('estimate', help="predict the archive size without building it")
+    estimate.add_argument('profile', choices=sorted(PROFILES))
+    estimate.add_argument('--root', default='.', help="project directory (default: .)")
+    estimate.add_argument('--prefix', default='', help="directory prefix for every member name")
+    estimate.add_argument('--level', type=int, help="deflate level for every deflated class "
+                                                    "(default: per-class policy)")
+    estimate.add_argument('--dedupe', choices=['exact', 'near'],
+                          help="keep one .md/.txt document per exact or near-duplicate cluster")
+    estimate.add_argument('--limit', type=parse_size,
+                          help="exit with status 1 if the estimate exceeds SIZE (e.g. 25M)")
+
+    bench = commands.add_parser('bench', help="compare serial and parallel build times")
+    bench.add_argument('profile', choices=sorted(PROFILES))
+    bench.add_argument('--root', default='.', help="project directory (default: .)")
+    bench.add_argument('--level', type=int, help="deflate level for every deflated class "
+                                                 "(default: per-class policy)")
+    bench.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help="processes for the parallel run (default: CPU count)")
+
+    args = parser.parse_args()
+    if getattr(args, 'output', None) == '-':
+        # The archive owns stdout; progress messages go to stderr.
+        with redirect_stdout(sys.stderr):
+            run(args)
+    else:
+        run(args)
+
+def run(args):
+    if args.command == 'build' and args.volume_size:
+        if args.output == '-' or (args.archive_format or 'zip') != 'zip':
+            print("Error: --volume-size writes zip files; give a .zip path as OUTPUT.")
+            sys.exit(1)
+        build_volumes(args.root, args.output, args.volume_size, args.profile, args.prefix,
+                      args.level, args.jobs, args.reproducible, args.dedupe)
+    elif args.command == 'build':
+        build_archive(args.root, args.output, args.profile, args.prefix, args.level, args.verbose,
+                      args.jobs, args.archive_format, args.reproducible, args.dedupe)
+    elif args.command == 'update':
+        update_archive(args.root, args.output, args.profile, args.prefix, args.level, args.verbose)
+    elif args.command == 'verify':
+        if not verify_archive(args.archive, args.root, args.profile, args.prefix, args.manifest,
+                              args.jobs):
+            sys.exit(1)
+    elif args.command == 'estimate':
+        report = estimate_archive(args.root, args.profile, args.prefix, args.level, args.dedupe)
+        if not print_estimate(report, args.limit):
+            sys.exit(1)
+    elif args.command == 'bench':
+        bench_archive(args.root, args.profile, args.jobs, args.level)
+    elif args.command == 'list':
+        for entry in iter_profile_files(args.root, get_profile(args.profile)):
+            print(entry.arcname)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Small helpers shared by the archive, extraction, delta and snapshot scripts.
+"""
+import os
+import sys
+import time
+import hashlib
+
+# Earliest timestamp a zip member can carry.
+ZIP_EPOCH = time.mktime((1980, 1, 1, 0, 0, 0, 0, 0, -1))
+# Read size for checksums and raw member copies.
+COPY_CHUNK_SIZE = 1024 * 1024
+ARCHIVE_FORMATS = ('zip', 'tar', 'tar.gz')
+# Suffix of the sidecar index written by assemble_code_files.py --index sidecar.
+INDEX_SUFFIX = '.index'
+# A bundle index records the SHA-256 of this many leading bundle bytes, so an
+# index is not trusted for a bundle edited in place at the same length.
+INDEX_HEAD_SIZE = 64 * 1024
+
+def archive_format_for(path):
+    """Return the archive format implied by path, or None."""
+    if path == '-':
+        return 'zip'
+    lowered = path.lower()
+    if lowered.endswith('.zip'):
+        return 'zip'
+    if lowered.endswith(('.tar.gz', '.tgz')):
+        return 'tar.gz'
+    if lowered.endswith('.tar'):
+        return 'tar'
+    return None
+
+def open_output(path):
+    """
+    Open path for binary writing; '-' means stdout, which may be a pipe.
+
+    stdout is duplicated from sys.__stdout__, so it is the real stdout even
+    while sys.stdout is redirected to stderr, and closing the returned file
+    leaves it open.
+    """
+    if path == '-':
+        return os.fdopen(os.dup(sys.__stdout__.fileno()), 'wb')
+    return open(path, 'wb')
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def safe_target(dest, name):
+    """Return the path of member name below dest, or None if it escapes dest."""
+    dest_root = os.path.realpath(dest)
+    target = os.path.realpath(os.path.join(dest, name))
+    if os.path.commonpath([dest_root, target]) != dest_root:
+        return None
+    return target
@@ -1,44 +1,320 @@
 #!/usr/bin/env python3
 import sys
 import os
+import stat
+import mmap
+import codecs
+import json
+import hashlib
+import argparse
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from archive_utils import INDEX_HEAD_SIZE, INDEX_SUFFIX, open_output
+from tree_walker import DEFAULT_IGNORE_FILES, IgnoreRules, iter_input_paths
+from near_duplicates import duplicate_paths
+
+# Candidate encodings, in the order they are tried.
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'utf-16']
+# Leading bytes inspected for NUL bytes when deciding text vs binary.
+BINARY_SNIFF_SIZE = 1024
+# Files at least this large are mapped instead of read into a buffer.
+MMAP_THRESHOLD = 1024 * 1024
+# Chunk a text-mode read(1) pulls from disk. The legacy check picked the
+# encoding from it, so the verdict still does; also used to estimate costs.
+LEGACY_TEXT_CHUNK = 8192
+# Size of the reads used by --stream; bounds memory per file.
+CHUNK_SIZE = 64 * 1024
+# Size of the bulk copies that carry unchanged blocks into a rebuilt bundle.
+COPY_SIZE = 1024 * 1024
+# Suffix of the sidecar manifest written by --incremental.
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+# Written after every block's content.
+BLOCK_FOOTER = "\n```\n\n"
+
+# Where progress messages go; moved to stderr while the bundle itself is
+# written to stdout.
+log_stream = None
+
+# size, mtime_ns and digest feed the incremental manifest; reused holds the
+# previous manifest entry when the block can be copied from the old bundle.
+FileProbe = namedtuple('FileProbe', ['path', 'is_text', 'encoding', 'content', 'reason',
+                                     'size', 'mtime_ns', 'digest', 'reused'],
+                       defaults=(None, None, None, None))
 
 def get_input_arguments():
     """Parse command-line arguments or prompt for missing inputs."""
-    if len(sys.argv) >= 3:
-        return sys.argv[1], sys.argv[2]
+    parser = argparse.ArgumentParser(description="Assemble listed files into a single fenced bundle.")
+    parser.add_argument('input_list', nargs='?',
+                        help="file containing one path, directory or glob pattern per line")
+    parser.add_argument('output', nargs='?', help="path of the assembled bundle")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="read, probe and decode files with N worker threads (default: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="copy file content in fixed-size chunks instead of reading it whole")
+    parser.add_argument('--incremental', action='store_true',
+                        help="keep a sidecar manifest and reuse unchanged blocks of the previous bundle")
+    parser.add_argument('--index', choices=['trailer', 'sidecar'],
+                        help="record path, byte offset and length of every block, appended to "
+                             "the bundle or in <output>.index, for random-access extraction")
+    parser.add_argument('--dedupe', choices=['exact', 'near'],
+                        help="keep one .md/.txt document per exact or near-duplicate cluster")
+    parser.add_argument('-i', '--include', action='append', default=[], metavar='PATH',
+                        help="file, directory or glob pattern to add (repeatable); "
+                             "with --include the list file is optional")
+    parser.add_argument('--ignore-file', action='append', metavar='NAME',
+                        help="ignore file to honour when walking directories, e.g. .dockerignore "
+                             f"(repeatable; default: {', '.join(DEFAULT_IGNORE_FILES)})")
+    parser.add_argument('--no-ignore', action='store_true',
+                        help="walk directories without reading any ignore file")
+    args = parser.parse_args()
     
-    input_file = sys.argv[1] if len(sys.argv) >= 2 else input("Enter the path to the list of files: ")
-    output_file = input("Enter the path for the output file: ")
+    if args.include and args.output is None:
+        # A single positional next to --include is the output path.
+        args.output, args.input_list = args.input_list, None
+    elif args.input_list is None:
+        args.input_list = input("Enter the path to the list of files: ")
+    if args.output is None:
+        args.output = input("Enter the path for the output file: ")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
-    return input_file, output_file
+    return args
+
+def log(message=""):
+    """Print a progress message to the current log stream."""
+    print(message, file=log_stream)
+
+def sniff_encoding(head):
+    """
+    Return the first of ENCODINGS that decodes head (a file's first
+    LEGACY_TEXT_CHUNK bytes) the way the legacy text-mode read(1) did, or None.
+    A file whose later bytes do not decode in that encoding is rejected.
+    """
+    for encoding in ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(head)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return None
+
+def decode_text(data, encoding):
+    """Decode raw bytes the way a text-mode read would (universal newlines)."""
+    text = str(data, encoding)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+class FileProber:
+    """
+    Decide text/binary and encoding from a single read of each file.
+
+    The previous approach reopened a file once per candidate encoding in
+    is_valid_text_file, again in get_file_encoding and once more for the real
+    read. Here every file is opened once (mapped when large), the verdict is
+    taken from that buffer, and the decoded content is handed to the writer.
+    Verdicts are cached for the run, keyed by inode, size and mtime, so paths
+    listed more than once are never probed twice. probe() is safe to call
+    from several threads; a thread asking for a file another thread is
+    probing waits for that verdict instead of probing it again.
+
+    With streaming=True the verdict is taken from a chunked scan instead and
+    no content is kept; copy_text_chunks() then writes the file in chunks.
+    With hash_content=True every text probe also carries the SHA-256 of the
+    raw file bytes, taken from the same read.
+    """
+
+    def __init__(self, hash_content=False):
+        self.hash_content = hash_content
+        self.lock = threading.Lock()
+        self.cache = {}
+        # Cache key -> Event set once the probing thread has cached its verdict.
+        self.in_progress = {}
+        self.files = 0
+        self.cache_hits = 0
+        self.opens = 0
+        self.bytes_read = 0
+        self.legacy_opens = 0
+        self.legacy_bytes = 0
+
+    def probe(self, file_path, streaming=False, previous=None):
+        """
+        Return a FileProbe for file_path, with content set for text files.
+
+        previous is the manifest entry from the last incremental build; when
+        size and mtime still match, only the stat is done and the probe is
+        marked as reused.
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return FileProbe(file_path, False, None, None, "File not found")
+        if not stat.S_ISREG(st.st_mode):
+            return FileProbe(file_path, False, None, None, "Not a valid text file")
+        if previous is not None and previous['size'] == st.st_size \
+                and previous['mtime_ns'] == st.st_mtime_ns:
+            return FileProbe(file_path, True, None, None, None, st.st_size,
+                             st.st_mtime_ns, previous['sha256'], previous)
+
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            self.files += 1
+            cached = self.cache.get(key)
+            in_progress = self.in_progress.get(key) if cached is None else None
+            if cached is None and in_progress is None:
+                self.in_progress[key] = threading.Event()
+        if in_progress is not None:
+            in_progress.wait()
+            with self.lock:
+                cached = self.cache.get(key)
+        if cached is not None:
+            with self.lock:
+                self.cache_hits += 1
+            if not cached.is_text or streaming:
+                return cached._replace(path=file_path)
+            return self._read_known(file_path, cached.encoding, st.st_size)._replace(
+                size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+        try:
+            if streaming:
+                result = self._scan_chunks(file_path, st.st_size)
+            else:
+                result = self._probe_uncached(file_path, st.st_size)
+            result = result._replace(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            with self.lock:
+                self.cache[key] = result._replace(content=None)
+        finally:
+            if in_progress is None:
+                with self.lock:
+                    self.in_progress.pop(key).set()
+        return result
+
+    def _digest(self, data):
+        if not self.hash_content:
+            return None
+        return hashlib.sha256(data).hexdigest()
+
+    def _count(self, opens, bytes_read):
+        with self.lock:
+            self.opens += opens
+            self.bytes_read += bytes_read
+
+    def _read_known(self, file_path, encoding, size):
+        """Re-read a file whose encoding is already known from the cache."""
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            return FileProbe(file_path, False, None, None, str(e))
+        self._count(1, len(data))
+        self._count_legacy(size, encoding)
+        return FileProbe(file_path, True, encoding, decode_text(data, encoding), None,
+                         digest=self._digest(data))
+
+    def _probe_uncached(self, file_path, size):
+        try:
+            with open(file_path, 'rb') as f:
+                self._count(1, 0)
+                if size >= MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        return self._classify(file_path, data, size)
+                data = f.read()
+                return self._classify(file_path, data, size)
+        except (OSError, ValueError) as e:
+            return FileProbe(file_path, False, None, None, str(e))
+
+    def _scan_chunks(self, file_path, size):
+        """Validate candidate encodings in CHUNK_SIZE steps, keeping no content."""
+        try:
+            with open(file_path, 'rb') as f:
+                self._count(1, 0)
+                head = f.read(max(BINARY_SNIFF_SIZE, LEGACY_TEXT_CHUNK))
+                encoding = sniff_encoding(head[:LEGACY_TEXT_CHUNK])
+                if b'\0' in head[:BINARY_SNIFF_SIZE] or encoding is None:
+                    self._count(0, len(head))
+                    self._count_legacy(size, None)
+                    return FileProbe(file_path, False, None, None, "Not a valid text file")
+                
+                f.seek(0)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                hasher = hashlib.sha256() if self.hash_content else None
+                try:
+                    while True:
+                        chunk = f.read(CHUNK_SIZE)
+                        self._count(0, len(chunk))
+                        decoder.decode(chunk, final=not chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        if not chunk:
+                            break
+                except UnicodeDecodeError as e:
+                    self._count_legacy(size, encoding)
+                    return FileProbe(file_path, False, None, None, str(e))
+                self._count_legacy(size, encoding)
+                digest = hasher.hexdigest() if hasher is not None else None
+                return FileProbe(file_path, True, encoding, None, None, digest=digest)
+        except OSError as e:
+            return FileProbe(file_path, False, None, None, str(e))
+
+    def copy_text_chunks(self, file_path, encoding, writer):
+        """Write a probed text file to writer in CHUNK_SIZE pieces."""
+        # errors='replace' keeps the fence intact if the file changed
+        # between the probe and the copy.
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            self._count(1, 0)
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        self._count(0, os.path.getsize(file_path))
+
+    def _classify(self, file_path, data, size):
+        head = data[:BINARY_SNIFF_SIZE]
+        if b'\0' in head:  # Null bytes indicate binary file
+            self._count(0, len(head))
+            self._count_legacy(size, None)
+            return FileProbe(file_path, False, None, None, "Not a valid text file")
+
+        self._count(0, size)
+        encoding = sniff_encoding(data[:LEGACY_TEXT_CHUNK])
+        if encoding is None:
+            self._count_legacy(size, None)
+            return FileProbe(file_path, False, None, None, "Not a valid text file")
+        self._count_legacy(size, encoding)
+        try:
+            content = decode_text(data, encoding)
+        except UnicodeDecodeError as e:
+            return FileProbe(file_path, False, None, None, str(e))
+        return FileProbe(file_path, True, encoding, content, None, digest=self._digest(data))
+
+    def _count_legacy(self, size, encoding):
+        """Account for what the per-encoding reopen path would have cost."""
+        opens = 1
+        bytes_read = min(size, BINARY_SNIFF_SIZE)
+        if encoding is not None:
+            attempts = ENCODINGS.index(encoding) + 1
+            # is_valid_text_file and get_file_encoding each open once per
+            # attempt, then the content is read in full.
+            opens += 2 * attempts + 1
+            bytes_read += 2 * attempts * min(size, LEGACY_TEXT_CHUNK) + size
+        with self.lock:
+            self.legacy_opens += opens
+            self.legacy_bytes += bytes_read
+
+    def summary(self):
+        """Return a one-line report of opens and bytes saved."""
+        return (f"Probed {self.files} files with {self.opens} opens "
+                f"({self.cache_hits} cache hits); saved "
+                f"{max(self.legacy_opens - self.opens, 0)} opens and "
+                f"{max(self.legacy_bytes - self.bytes_read, 0):,} bytes read")
 
 def is_valid_text_file(file_path):
     """Check if the file exists and is a valid text file."""
-    if not os.path.exists(file_path):
-        return False
-    
-    if not os.path.isfile(file_path):
-        return False
-    
-    # Check for binary content
-    try:
-        with open(file_path, 'rb') as f:
-            data = f.read(1024)
-            if b'\0' in data:  # Null bytes indicate binary file
-                return False
-        
-        # Try reading with common encodings
-        for encoding in ['utf-8', 'latin-1', 'cp1252', 'utf-16']:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read(1)
-                return True
-            except UnicodeDecodeError:
-                continue
-        
-        return False
-    except Exception:
-        return False
+    return FileProber().probe(file_path).is_text
 
 def get_file_extension(file_path):
     """Extract file extension without the dot."""
@@ -49,92 +325,338 @@ def get_file_extension(file_path):
 
 def get_file_encoding(file_path):
     """Determine suitable encoding for reading the file."""
-    for encoding in ['utf-8', 'latin-1', 'cp1252', 'utf-16']:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1)
-            return encoding
-        except UnicodeDecodeError:
-            continue
+    result = FileProber().probe(file_path)
+    if result.is_text:
+        return result.encoding
     return 'latin-1'  # Fallback that won't raise UnicodeDecodeError
 
-def process_files(input_list_path, output_file_path):
-    """Process files from the list and create assembled output."""
-    if not os.path.exists(input_list_path):
-        print(f"Error: Input file '{input_list_path}' does not exist.")
+class BundleWriter:
+    """
+    Encode bundle text as UTF-8 onto a binary stream, tracking the byte
+    offset and the SHA-256 of the first INDEX_HEAD_SIZE bytes.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = 0
+        self.head = hashlib.sha256()
+
+    def write(self, text):
+        self.write_bytes(text.encode('utf-8'))
+
+    def write_bytes(self, data):
+        self.stream.write(data)
+        if self.offset < INDEX_HEAD_SIZE:
+            self.head.update(data[:INDEX_HEAD_SIZE - self.offset])
+        self.offset += len(data)
+
+def block_header(file_path):
+    """Return the '# path' line and opening fence that start a block."""
+    return f"# {file_path}\n```{get_file_extension(file_path)}\n"
+
+def format_bundle_index(blocks, data_size, head_sha256, bundle_mtime_ns=None):
+    """
+    Render the index of a bundle whose blocks occupy the first data_size bytes.
+
+    Each entry is 'offset<TAB>length<TAB>path' for the file content of one
+    block. The text is an HTML comment so it stays invisible when the bundle
+    is rendered, and ends with a fixed-format line giving the offset of the
+    index itself, so a reader only needs the last line to find it. The
+    header records head_sha256 (see BundleWriter) and, for a sidecar, the
+    bundle's mtime, which a reader checks before trusting the offsets.
+    """
+    header = f"<!-- bundle-index v2 data-size={data_size} head-sha256={head_sha256}"
+    if bundle_mtime_ns is not None:
+        header += f" bundle-mtime-ns={bundle_mtime_ns}"
+    lines = [header]
+    for block in blocks:
+        header_length = len(block_header(block['path']).encode('utf-8'))
+        content_length = block['length'] - header_length - len(BLOCK_FOOTER)
+        lines.append(f"{block['offset'] + header_length}\t{content_length}\t{block['path']}")
+    lines.append("-->")
+    lines.append(f"<!-- bundle-index-offset: {data_size:020d} -->")
+    return '\n'.join(lines) + '\n'
+
+def copy_segment(source, start, length, writer):
+    """Copy length bytes at start of the previous bundle into writer."""
+    source.seek(start)
+    while length > 0:
+        data = source.read(min(COPY_SIZE, length))
+        if not data:
+            raise IOError("previous bundle is shorter than its manifest")
+        writer.write_bytes(data)
+        length -= len(data)
+
+def manifest_path_for(output_file_path):
+    return output_file_path + MANIFEST_SUFFIX
+
+def load_manifest(output_file_path):
+    """
+    Return {path: block entry} from the previous incremental build.
+
+    The manifest is only trusted when the bundle next to it still has the
+    size and mtime recorded at the end of that build.
+    """
+    try:
+        with open(manifest_path_for(output_file_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        st = os.stat(output_file_path)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION \
+            or manifest.get('bundle_size') != st.st_size \
+            or manifest.get('bundle_mtime_ns') != st.st_mtime_ns:
+        return {}
+    return {block['path']: block for block in manifest['blocks']}
+
+def save_manifest(output_file_path, blocks):
+    st = os.stat(output_file_path)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'bundle_size': st.st_size,
+        'bundle_mtime_ns': st.st_mtime_ns,
+        'blocks': blocks,
+    }
+    manifest_path = manifest_path_for(output_file_path)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+        f.write('\n')
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+def iter_probed_files(file_paths, prober, jobs=1, streaming=False, previous_blocks=None):
+    """
+    Yield probe results in input order.
+
+    With jobs > 1 files are read, probed and decoded by a thread pool that
+    runs at most 2 * jobs files ahead of the consumer, so the output order
+    (and therefore the bundle bytes) matches the serial run exactly while
+    memory stays bounded by the look-ahead window.
+    """
+    previous_blocks = previous_blocks or {}
+    if jobs <= 1:
+        for file_path in file_paths:
+            yield prober.probe(file_path, streaming, previous_blocks.get(file_path))
+        return
+    
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(executor.submit(prober.probe, file_path, streaming,
+                                           previous_blocks.get(file_path)))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def process_files(input_list_path, output_file_path, prober=None, jobs=1, streaming=False,
+                  incremental=False, include=(), rules=None, index=None, dedupe=None):
+    """
+    Process files from the list and create assembled output.
+
+    Entries of the list (and of include) may be files, directories or glob
+    patterns. Directories and globs are walked lazily with os.scandir,
+    pruning directories ignored by rules (an IgnoreRules, by default the
+    project's .gitignore) before descending, so assembly starts while the
+    walk is still in progress.
+
+    output_file_path may be '-' to write the bundle to stdout. With
+    streaming=True file content is copied in CHUNK_SIZE pieces, so peak
+    memory does not depend on the size of any single file.
+
+    With incremental=True a sidecar manifest records path, size, mtime,
+    content hash and byte range of every block. The next run stats each file
+    and copies the blocks whose size and mtime are unchanged straight from
+    the previous bundle (adjacent blocks in one bulk copy); only changed
+    files are read and probed.
+
+    index='trailer' appends a byte-offset index of all blocks to the bundle,
+    index='sidecar' writes it to <output>.index instead (see
+    format_bundle_index); extract_code_files.py --select uses it to seek
+    straight to the requested files.
+
+    dedupe='exact' or 'near' leaves out duplicate .md/.txt documents (see
+    near_duplicates.py), keeping one representative per cluster. The walk
+    has to finish before assembly starts in that case.
+    """
+    global log_stream
+    previous_stream = log_stream
+    if output_file_path == '-':
+        log_stream = sys.stderr
+    try:
+        return _process_files(input_list_path, output_file_path, prober, jobs, streaming,
+                              incremental, include, rules, index, dedupe)
+    finally:
+        log_stream = previous_stream
+
+def _process_files(input_list_path, output_file_path, prober, jobs, streaming, incremental,
+                   include, rules, index, dedupe):
+    """Do the work of process_files once the log stream is settled."""
+    if input_list_path is not None and not os.path.exists(input_list_path):
+        log(f"Error: Input file '{input_list_path}' does not exist.")
+        sys.exit(1)
+    if incremental and output_file_path == '-':
+        log("Error: --incremental needs an output file, not stdout.")
+        sys.exit(1)
+    if index == 'sidecar' and output_file_path == '-':
+        log("Error: --index sidecar needs an output file; use --index trailer with stdout.")
         sys.exit(1)
     
+    if prober is None:
+        prober = FileProber(hash_content=incremental)
+    if rules is None:
+        rules = IgnoreRules.from_files('.')
     processed_count = 0
     rejected_files = []
+    previous_blocks = load_manifest(output_file_path) if incremental else {}
+    blocks = []
+    reused_count = 0
+    reused_bytes = 0
     
     try:
         # Read the list of files
-        with open(input_list_path, 'r', encoding='utf-8') as list_file:
-            file_paths = [line.strip() for line in list_file if line.strip()]
+        entries = []
+        if input_list_path is not None:
+            with open(input_list_path, 'r', encoding='utf-8') as list_file:
+                entries = [line.strip() for line in list_file if line.strip()]
+        entries.extend(include)
+        
+        # An incremental build is written next to the previous bundle and
+        # swapped in at the end, so the old blocks stay readable meanwhile.
+        target_path = output_file_path + '.tmp' if incremental else output_file_path
+        # Never pick up the bundle (or its sidecars) when walking the tree.
+        own_files = {os.path.abspath(path) for path in
+                     (output_file_path, target_path, manifest_path_for(output_file_path),
+                      output_file_path + INDEX_SUFFIX)}
+        file_paths = (path for path in iter_input_paths(entries, rules)
+                      if os.path.abspath(path) not in own_files)
+        if dedupe:
+            file_paths = list(file_paths)
+            dropped, saved, clusters = duplicate_paths(file_paths, dedupe)
+            for cluster in clusters:
+                for path in cluster.drop:
+                    log(f"Duplicate of {cluster.keep}: {path}")
+            log(f"Duplicate documents left out: {len(dropped)} ({saved / 1024:.1f} KB saved)")
+            file_paths = [path for path in file_paths if path not in dropped]
+        previous_bundle = open(output_file_path, 'rb') if previous_blocks else None
+        # Byte range of the previous bundle still waiting to be copied.
+        copy_start = copy_end = None
         
         # Open the output file
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            for file_path in file_paths:
-                print(f"Processing: {file_path}")
+        with open_output(target_path) as output_file:
+            writer = BundleWriter(output_file)
+            for result in iter_probed_files(file_paths, prober, jobs, streaming, previous_blocks):
+                file_path = result.path
+                log(f"Processing: {file_path}")
                 
-                if not os.path.exists(file_path):
-                    print(f"  Skipping: File not found: {file_path}")
-                    rejected_files.append((file_path, "File not found"))
+                if result.reused is not None:
+                    entry = result.reused
+                    if copy_end != entry['offset']:
+                        if copy_start is not None:
+                            copy_segment(previous_bundle, copy_start, copy_end - copy_start, writer)
+                        copy_start = entry['offset']
+                    copy_end = entry['offset'] + entry['length']
+                    blocks.append(dict(entry, offset=writer.offset + entry['offset'] - copy_start))
+                    reused_count += 1
+                    reused_bytes += entry['length']
+                    processed_count += 1
+                    log(f"  Unchanged, reused: {file_path}")
                     continue
+                if copy_start is not None:
+                    copy_segment(previous_bundle, copy_start, copy_end - copy_start, writer)
+                    copy_start = copy_end = None
                 
-                if is_valid_text_file(file_path):
-                    ext = get_file_extension(file_path)
-                    
-                    # Write header and opening code block
-                    output_file.write(f"# {file_path}\n")
-                    output_file.write(f"```{ext}\n")
-                    
-                    # Read and write file content
-                    try:
-                        encoding = get_file_encoding(file_path)
-                        with open(file_path, 'r', encoding=encoding) as input_file:
-                            output_file.write(input_file.read())
-                    except Exception as e:
-                        print(f"  Warning: Error reading file: {e}")
-                        rejected_files.append((file_path, str(e)))
-                        continue
-                    
-                    # Write closing code block and blank line
-                    output_file.write("\n```\n\n")
-                    
-                    processed_count += 1
-                    print(f"  Added to output: {file_path}")
+                if not result.is_text:
+                    if result.reason == "File not found":
+                        log(f"  Skipping: File not found: {file_path}")
+                    elif result.reason == "Not a valid text file":
+                        log(f"  Skipping: Not a valid text file: {file_path}")
+                    else:
+                        log(f"  Warning: Error reading file: {result.reason}")
+                    rejected_files.append((file_path, result.reason))
+                    continue
+                
+                # Write header, content and closing code block
+                block_start = writer.offset
+                writer.write(block_header(file_path))
+                if streaming:
+                    prober.copy_text_chunks(file_path, result.encoding, writer)
                 else:
-                    print(f"  Skipping: Not a valid text file: {file_path}")
-                    rejected_files.append((file_path, "Not a valid text file"))
+                    writer.write(result.content)
+                writer.write(BLOCK_FOOTER)
+                blocks.append({
+                    'path': file_path,
+                    'size': result.size,
+                    'mtime_ns': result.mtime_ns,
+                    'sha256': result.digest,
+                    'offset': block_start,
+                    'length': writer.offset - block_start,
+                })
+                
+                processed_count += 1
+                log(f"  Added to output: {file_path}")
+            
+            if copy_start is not None:
+                copy_segment(previous_bundle, copy_start, copy_end - copy_start, writer)
+            if index == 'trailer':
+                writer.write(format_bundle_index(blocks, writer.offset,
+                                                 writer.head.hexdigest()))
+            data_size = writer.offset
+            head_sha256 = writer.head.hexdigest()
+        
+        if previous_bundle is not None:
+            previous_bundle.close()
+        if incremental:
+            os.replace(target_path, output_file_path)
+            save_manifest(output_file_path, blocks)
+            log(f"Incremental build: reused {reused_count} unchanged blocks "
+                f"({reused_bytes:,} bytes), read {processed_count - reused_count} files")
+        if index == 'sidecar':
+            with open(output_file_path + INDEX_SUFFIX, 'w', encoding='utf-8') as index_file:
+                index_file.write(format_bundle_index(blocks, data_size, head_sha256,
+                                                     os.stat(output_file_path).st_mtime_ns))
         
         return processed_count, rejected_files
     
     except Exception as e:
-        print(f"Error during processing: {e}")
+        log(f"Error during processing: {e}")
         sys.exit(1)
 
 def main():
+    global log_stream
+    
     # Get input and output file paths
-    input_list_path, output_file_path = get_input_arguments()
+    args = get_input_arguments()
+    input_list_path, output_file_path = args.input_list, args.output
+    if output_file_path == '-':
+        log_stream = sys.stderr
     
-    print(f"Reading file list from: {input_list_path}")
-    print(f"Writing assembled output to: {output_file_path}")
+    if input_list_path is not None:
+        log(f"Reading file list from: {input_list_path}")
+    log(f"Writing assembled output to: {output_file_path}")
     
     # Process the files
-    processed_count, rejected_files = process_files(input_list_path, output_file_path)
+    prober = FileProber(hash_content=args.incremental)
+    if args.no_ignore:
+        rules = IgnoreRules('.')
+    else:
+        rules = IgnoreRules.from_files('.', args.ignore_file or DEFAULT_IGNORE_FILES)
+    processed_count, rejected_files = process_files(input_list_path, output_file_path, prober,
+                                                    args.jobs, args.stream, args.incremental,
+                                                    args.include, rules, args.index, args.dedupe)
     
     # Print summary statistics
-    print("\nProcessing complete!")
-    print(f"Files successfully processed: {processed_count}")
+    log("\nProcessing complete!")
+    log(f"Files successfully processed: {processed_count}")
+    log(prober.summary())
+    log(f"Paths left out by ignore rules: {rules.pruned}")
     
     if rejected_files:
-        print(f"Files rejected: {len(rejected_files)}")
-        print("\nRejected files:")
+        log(f"Files rejected: {len(rejected_files)}")
+        log("\nRejected files:")
         for file_path, reason in rejected_files:
-            print(f"  - {file_path}: {reason}")
+            log(f"  - {file_path}: {reason}")
     else:
-        print("No files were rejected.")
+        log("No files were rejected.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled ignore matcher in tree_walker.py.
+
+Builds a synthetic tree of 200k paths, matches every path and directory
+against the project's .gitignore and .dockerignore rules, and compares the
+single compiled regex with the rule-by-rule loop it replaced. Both must
+agree on every path.
+
+Usage:
+    python bench_ignore_rules.py [--paths N] [--root DIR]
+"""
+import time
+import random
+import argparse
+
+from tree_walker import IgnoreRules
+
+TOP_DIRS = ['app', 'components', 'lib', 'supabase', 'docs', 'tests', 'public', 'scripts',
+            'node_modules', '.next', 'dist', 'coverage', 'build', 'design-system']
+SUB_DIRS = ['auth', 'patient', 'doctor', 'admin', 'api', 'ui', 'forms', 'hooks', 'utils',
+            'migrations', 'functions', 'e2e', '__tests__', 'logs', 'fonts']
+FILE_NAMES = ['page', 'layout', 'index', 'route', 'button', 'card', 'client', 'server',
+              'schema', 'README', 'config', 'utils', 'debug', 'types']
+EXTENSIONS = ['.ts', '.tsx', '.js', '.json', '.md', '.sql', '.test.ts', '.spec.tsx', '.log',
+              '.css', '.png', '.env', '.swp']
+
+def synthetic_paths(count, seed=0):
+    """Return (rel_path, is_dir) pairs for a deterministic synthetic tree."""
+    rng = random.Random(seed)
+    paths = []
+    while len(paths) < count:
+        depth = rng.randint(0, 4)
+        parts = [rng.choice(TOP_DIRS)] + [rng.choice(SUB_DIRS) for _ in range(depth)]
+        if rng.random() < 0.2:
+            paths.append(('/'.join(parts), True))
+        else:
+            name = rng.choice(FILE_NAMES) + rng.choice(EXTENSIONS)
+            paths.append(('/'.join(parts + [name]), False))
+    return paths
+
+def is_ignored_by_loop(rules, rel_path, is_dir=False):
+    """The previous matcher: every rule tested in order, the last match wins."""
+    if is_dir and rel_path.rsplit('/', 1)[-1] in rules.ignored_dirs:
+        return True
+    ignored = False
+    for rule in rules.rules:
+        if rule.negated == ignored and rule.matches(rel_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+def run_benchmark(count, root='.'):
+    rules = IgnoreRules.from_files(root, ('.gitignore', '.dockerignore'))
+    paths = synthetic_paths(count)
+    print(f"Rules: {len(rules.rules)} from .gitignore and .dockerignore, paths: {len(paths)}")
+
+    started = time.perf_counter()
+    loop_results = [is_ignored_by_loop(rules, path, is_dir) for path, is_dir in paths]
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rules.compile()
+    compiled_results = [rules.is_ignored(path, is_dir) for path, is_dir in paths]
+    compiled_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(loop_results, compiled_results) if a != b)
+    print(f"rule loop:      {loop_seconds:.2f}s ({len(paths) / loop_seconds:,.0f} paths/s)")
+    print(f"compiled regex: {compiled_seconds:.2f}s ({len(paths) / compiled_seconds:,.0f} paths/s, "
+          f"{loop_seconds / compiled_seconds:.1f}x)")
+    print(f"Ignored: {sum(compiled_results)}, mismatches: {mismatches}")
+    return mismatches == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled ignore matcher.")
+    parser.add_argument('--paths', type=int, default=200000, help="synthetic paths (default: 200000)")
+    parser.add_argument('--root', default='.', help="directory holding the ignore files (default: .)")
+    args = parser.parse_args()
+    if not run_benchmark(args.paths, args.root):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
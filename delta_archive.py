@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Delta archives: ship only what changed since a base release.
+
+A delta is an ordinary zip holding the added and modified files of a
+profile plus a DELTA_MANIFEST_NAME member listing them and the paths that
+were deleted. The base is either an earlier archive (members compared by
+size and CRC) or a snapshot manifest written by snapshot_store.py
+(compared by size, then SHA-256).
+
+Usage:
+    python delta_archive.py create PROFILE BASE OUTPUT [--root DIR] [--prefix DIR/]
+    python delta_archive.py apply DELTA DEST [--base ARCHIVE]
+
+apply writes into a directory, or rebuilds a full zip when DEST ends in
+.zip: unchanged base members are copied through without recompression.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import zipfile
+import argparse
+
+from archive_engine import (PROFILES, get_profile, iter_compressed_entries, member_is_current,
+                            read_raw_member, scan_profile, write_compressed_member,
+                            write_raw_member)
+from archive_utils import file_sha256, safe_target
+
+DELTA_MANIFEST_NAME = '.delta-manifest.json'
+DELTA_VERSION = 1
+
+def load_base(base, arc_prefix=''):
+    """
+    Return (kind, members) for a base archive or snapshot manifest, where
+    members maps member names to ZipInfo objects or manifest entries. The
+    paths of a snapshot manifest are prefixed with arc_prefix, as in
+    verify_archive; archive members already carry theirs.
+    """
+    if zipfile.is_zipfile(base):
+        with zipfile.ZipFile(base, 'r') as zipf:
+            return 'archive', {info.filename: info for info in zipf.infolist()
+                               if not info.is_dir()}
+    try:
+        with open(base, 'r', encoding='utf-8') as f:
+            return 'snapshot', {arc_prefix + path: entry
+                                for path, entry in json.load(f)['files'].items()}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: '{base}' is neither a zip archive nor a snapshot manifest: {e}")
+        sys.exit(1)
+
+def is_unchanged(kind, member, entry):
+    if kind == 'archive':
+        return member_is_current(member, entry.path, entry.stat)
+    return member['size'] == entry.stat.st_size and member['sha256'] == file_sha256(entry.path)
+
+def create_delta(root, base, output, profile='full', arc_prefix='', compresslevel=None, jobs=1):
+    """
+    Write a delta archive of root against base and return its manifest.
+
+    Only added and modified files are compressed into output; deleted
+    paths are recorded in the manifest member. The manifest lists only the
+    files actually written, so a file that cannot be read is left as it is
+    in the base instead of being dropped by apply.
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if not os.path.isdir(root):
+        print(f"Error: Source directory '{root}' does not exist.")
+        sys.exit(1)
+
+    started = time.time()
+    kind, base_members = load_base(base, arc_prefix)
+    remaining = dict(base_members)
+    added = []
+    modified = []
+    changed_entries = []
+    for entry in scan_profile(root, profile, arc_prefix, [output]):
+        member = remaining.pop(entry.arcname, None)
+        try:
+            if member is not None and is_unchanged(kind, member, entry):
+                continue
+        except OSError as e:
+            print(f"  Skipped: {entry.arcname} - {e}")
+            continue
+        (added if member is None else modified).append(entry.arcname)
+        changed_entries.append(entry)
+
+    source_bytes = 0
+    written = set()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for entry, fetch in iter_compressed_entries(changed_entries, compresslevel, jobs):
+            try:
+                member = fetch()
+            except OSError as e:
+                print(f"  Skipped: {entry.arcname} - {e} (left unchanged in the delta)")
+                continue
+            write_compressed_member(zipf, entry, member)
+            written.add(entry.arcname)
+            source_bytes += member.size
+        manifest = {
+            'version': DELTA_VERSION,
+            'base': os.path.basename(base),
+            'base_files': len(base_members),
+            'added': [name for name in added if name in written],
+            'modified': [name for name in modified if name in written],
+            'deleted': sorted(remaining),
+        }
+        zipf.writestr(DELTA_MANIFEST_NAME, json.dumps(manifest, indent=1))
+
+    print(f"\nDelta created: {output} (against {base})")
+    print(f"Added: {len(manifest['added'])}, modified: {len(manifest['modified'])}, "
+          f"deleted: {len(manifest['deleted'])}")
+    print(f"Changed source: {source_bytes / 1024:.1f} KB")
+    print(f"Delta size: {os.path.getsize(output) / 1024:.1f} KB")
+    print(f"Time: {time.time() - started:.2f}s")
+    return manifest
+
+def read_delta_manifest(delta):
+    if DELTA_MANIFEST_NAME not in delta.NameToInfo:
+        print(f"Error: '{delta.filename}' is not a delta archive (no {DELTA_MANIFEST_NAME}).")
+        sys.exit(1)
+    return json.loads(delta.read(DELTA_MANIFEST_NAME))
+
+def apply_to_directory(delta, manifest, dest, base=None):
+    if base is not None:
+        with zipfile.ZipFile(base, 'r') as base_zip:
+            base_zip.extractall(dest)
+    for name in manifest['deleted']:
+        target = safe_target(dest, name)
+        if target is None:
+            print(f"  Skipped unsafe path: {name}")
+        elif os.path.isfile(target):
+            os.remove(target)
+        else:
+            print(f"  Warning: {name} is already gone")
+    for info in delta.infolist():
+        if info.filename != DELTA_MANIFEST_NAME:
+            delta.extract(info, dest)
+
+def apply_to_archive(delta, manifest, dest, base):
+    """Rebuild a full zip: base members copied raw, then the delta's members."""
+    replaced = set(manifest['deleted']) | set(manifest['modified'])
+    temp_output = dest + '.tmp'
+    try:
+        with zipfile.ZipFile(base, 'r') as base_zip, \
+                zipfile.ZipFile(temp_output, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for info in base_zip.infolist():
+                if info.filename not in replaced:
+                    write_raw_member(zipf, copy.copy(info), read_raw_member(base_zip.fp, info))
+            for info in delta.infolist():
+                if info.filename != DELTA_MANIFEST_NAME:
+                    write_raw_member(zipf, copy.copy(info), read_raw_member(delta.fp, info))
+        os.replace(temp_output, dest)
+    except BaseException:
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
+        raise
+
+def apply_delta(delta_path, dest, base=None):
+    """
+    Reconstruct the full tree from a delta.
+
+    dest is a directory (updated in place, or populated from base first)
+    or, when it ends in .zip, a full archive rebuilt from base.
+    """
+    with zipfile.ZipFile(delta_path, 'r') as delta:
+        manifest = read_delta_manifest(delta)
+        if dest.lower().endswith('.zip'):
+            if base is None:
+                print("Error: --base is required to rebuild an archive.")
+                sys.exit(1)
+            apply_to_archive(delta, manifest, dest, base)
+        else:
+            apply_to_directory(delta, manifest, dest, base)
+    print(f"Applied {delta_path} to {dest}: {len(manifest['added'])} added, "
+          f"{len(manifest['modified'])} modified, {len(manifest['deleted'])} deleted")
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and apply delta archives.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help="write the changes since BASE to a delta zip")
+    create.add_argument('profile', choices=sorted(PROFILES))
+    create.add_argument('base', help="base archive or snapshot manifest (.json)")
+    create.add_argument('output', help="delta archive path")
+    create.add_argument('--root', default='.', help="project directory (default: .)")
+    create.add_argument('--prefix', default='', help="directory prefix for every member name")
+    create.add_argument('-j', '--jobs', type=int, default=1,
+                        help="compress members in N processes (default: 1)")
+
+    apply = commands.add_parser('apply', help="reconstruct the full tree or archive from a delta")
+    apply.add_argument('delta')
+    apply.add_argument('dest', help="directory, or a .zip to rebuild the full archive")
+    apply.add_argument('--base', help="base archive to start from")
+
+    args = parser.parse_args()
+    if args.command == 'create':
+        create_delta(args.root, args.base, args.output, args.profile, args.prefix, jobs=args.jobs)
+    elif args.command == 'apply':
+        apply_delta(args.delta, args.dest, args.base)
+
+if __name__ == "__main__":
+    main()
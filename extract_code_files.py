@@ -2,35 +2,101 @@
 import os
 import sys
 import re
+import time
+import codecs
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import argparse
+import posixpath
+import tempfile
+from contextlib import redirect_stdout
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from archive_utils import (ARCHIVE_FORMATS, INDEX_HEAD_SIZE, INDEX_SUFFIX, archive_format_for,
+                           open_output)
+from tree_walker import has_glob_magic, translate_glob
+
+# The last line of an index, giving the byte offset where the index starts.
+INDEX_OFFSET_PATTERN = re.compile(rb"<!-- bundle-index-offset: (\d+) -->\n$")
+INDEX_HEADER_PATTERN = re.compile(r"^<!-- bundle-index v2 data-size=(\d+)"
+                                  r" head-sha256=([0-9a-f]{64})(?: bundle-mtime-ns=(\d+))?$")
+# Enough of the bundle's tail to hold the offset line.
+INDEX_TAIL_SIZE = 64
+# Leading bytes inspected for NUL bytes and used to pick the encoding.
+SNIFF_SIZE = 64 * 1024
+# Encoding used for lines that do not decode with the detected one.
+FALLBACK_ENCODING = 'latin-1'
+# Read size used when hashing an existing file for --skip-unchanged.
+COMPARE_CHUNK_SIZE = 1024 * 1024
+# Blocks stay in memory up to this size until they are complete, then
+# spill to a temporary file.
+BLOCK_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Accept code fence markers for various languages.
+code_fence_pattern = re.compile(r"^```(?:python|py|ts|tsx|js|jsx|json|prisma|css|mjs|typescript|sql)\s*$")
+# Support marker lines that start with "# File:" or with "//"
+file_marker_pattern = re.compile(r"^(?:#\s*File:\s*|//\s*)(.+)$")
+closing_fence_pattern = re.compile(r"^```\s*$")
 
 def get_input_arguments():
     """Parse command-line arguments or prompt for missing input."""
-    if len(sys.argv) >= 2:
-        return sys.argv[1]
-    input_file = input("Enter the path to the compacted input file: ")
-    return input_file
+    parser = argparse.ArgumentParser(description="Extract files from a bundle of fenced code blocks.")
+    parser.add_argument('input_file', nargs='?', help="bundle to extract")
+    parser.add_argument('-s', '--select', action='append', default=[], metavar='PATTERN',
+                        help="extract only this path or glob (repeatable), seeking through the "
+                             "bundle index written by assemble_code_files.py --index, or "
+                             "scanning the bundle when it has no valid index")
+    parser.add_argument('--list', action='store_true',
+                        help="list the paths in the bundle index and exit")
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help="leave files whose content already matches untouched, "
+                             "preserving their mtimes for incremental builds")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="write files with N worker threads (default: 1)")
+    parser.add_argument('-a', '--archive', metavar='PATH',
+                        help="write the extracted files into this zip/tar archive ('-' for "
+                             "stdout) instead of the working tree")
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS,
+                        help="archive format (default: from the archive extension, zip for stdout)")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.archive is not None and args.archive_format is None:
+        args.archive_format = archive_format_for(args.archive)
+        if args.archive_format is None:
+            parser.error("cannot tell the archive format from the name; use --archive-format")
+    if args.input_file is None:
+        args.input_file = input("Enter the path to the compacted input file: ")
+    return args
 
 def is_readable_text_file(file_path):
-    """Check if the file exists and is a readable text file."""
+    """
+    Check if the file exists and is a readable text file.
+
+    Only the first SNIFF_SIZE bytes are read: they must contain no NUL byte
+    in the first 1024 and decide between UTF-8 and the latin-1 fallback.
+    iter_bundle_lines() keeps checking as it streams the rest.
+    """
     if not os.path.exists(file_path):
         return False, "File does not exist"
     if not os.path.isfile(file_path):
         return False, "Not a regular file"
     try:
         with open(file_path, 'rb') as f:
-            data = f.read(1024)
-            if b'\0' in data:
-                return False, "File appears to be binary"
-        for encoding in ['utf-8', 'latin-1', 'cp1252', 'utf-16']:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read()
-                return True, encoding
-            except UnicodeDecodeError:
-                continue
-        return False, "Could not determine text encoding"
+            data = f.read(SNIFF_SIZE)
     except Exception as e:
         return False, str(e)
+    if b'\0' in data[:1024]:
+        return False, "File appears to be binary"
+    try:
+        # Not final: a multi-byte character may straddle the sniff window.
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+    except UnicodeDecodeError:
+        return True, FALLBACK_ENCODING
+    return True, 'utf-8'
 
 def normalize_path(path_str):
     """Normalize path by handling quotes and escapes."""
@@ -54,7 +120,563 @@ def ensure_directory_exists(file_path):
             return False
     return True
 
-def extract_files(input_file_path, encoding):
+class DirectoryCache:
+    """
+    Create each output directory at most once per run.
+
+    Directories known to exist (including every parent of one that was
+    created) are remembered, so later blocks in the same directory cost no
+    exists/makedirs syscalls. create_all() creates a whole precomputed set
+    in one sorted pass.
+    """
+
+    def __init__(self):
+        self.known = {''}
+
+    def ensure(self, file_path):
+        directory = os.path.dirname(file_path)
+        if directory in self.known:
+            return True
+        if not ensure_directory_exists(file_path):
+            return False
+        while directory not in self.known:
+            self.known.add(directory)
+            directory = os.path.dirname(directory)
+        return True
+
+    def create_all(self, file_paths):
+        """Create the directories of all file_paths; return those that failed."""
+        failed = set()
+        for directory in sorted({os.path.dirname(path) for path in file_paths}):
+            if not self.ensure(os.path.join(directory, '')):
+                failed.add(directory)
+        return failed
+
+def parse_bundle_index(text):
+    """
+    Return (data_size, head_sha256, bundle_mtime_ns, [(path, offset, length), ...])
+    from index text; bundle_mtime_ns is None for a trailer.
+    """
+    lines = text.split('\n')
+    header = INDEX_HEADER_PATTERN.match(lines[0])
+    if header is None:
+        raise ValueError("not a bundle index")
+    entries = []
+    for line in lines[1:]:
+        if line == '-->':
+            break
+        offset, length, path = line.split('\t', 2)
+        entries.append((path, int(offset), int(length)))
+    mtime_ns = header.group(3)
+    return (int(header.group(1)), header.group(2), None if mtime_ns is None else int(mtime_ns),
+            entries)
+
+def bundle_head_sha256(input_file_path, data_size):
+    """Return the SHA-256 of the leading bundle bytes an index records."""
+    with open(input_file_path, 'rb') as f:
+        return hashlib.sha256(f.read(min(data_size, INDEX_HEAD_SIZE))).hexdigest()
+
+def read_bundle_index(input_file_path):
+    """
+    Locate and parse the index of a bundle, or return None if it has none.
+
+    A sidecar <bundle>.index is used when the bundle still has the size,
+    mtime and leading bytes it records; otherwise the trailer is found from
+    the bundle's last line and checked against the leading bytes. Only the
+    index and the first INDEX_HEAD_SIZE bytes are read, never the blocks.
+    """
+    st = os.stat(input_file_path)
+    bundle_size = st.st_size
+    try:
+        with open(input_file_path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+            data_size, head_sha256, mtime_ns, entries = parse_bundle_index(f.read())
+        if (data_size == bundle_size and mtime_ns == st.st_mtime_ns
+                and head_sha256 == bundle_head_sha256(input_file_path, data_size)):
+            return entries
+        print(f"  Warning: Ignoring stale index {input_file_path + INDEX_SUFFIX}")
+    except (OSError, ValueError):
+        pass
+
+    with open(input_file_path, 'rb') as f:
+        f.seek(max(bundle_size - INDEX_TAIL_SIZE, 0))
+        match = INDEX_OFFSET_PATTERN.search(f.read())
+        if match is None:
+            return None
+        index_offset = int(match.group(1))
+        f.seek(index_offset)
+        try:
+            data_size, head_sha256, _, entries = parse_bundle_index(
+                f.read(bundle_size - index_offset).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            return None
+    if data_size != index_offset or head_sha256 != bundle_head_sha256(input_file_path, data_size):
+        return None
+    return entries
+
+def path_matcher(patterns):
+    """Return a predicate that is True for paths equal to or matching one of patterns."""
+    exact = {pattern for pattern in patterns if not has_glob_magic(pattern)}
+    regexes = [re.compile(translate_glob(pattern) + '$') for pattern in patterns
+               if has_glob_magic(pattern)]
+    return lambda path: path in exact or any(regex.match(path) for regex in regexes)
+
+def select_index_entries(entries, patterns):
+    """Return the index entries whose path equals or matches one of patterns."""
+    selected = path_matcher(patterns)
+    return [entry for entry in entries if selected(entry[0])]
+
+def extract_selected(input_file_path, entries, skip_unchanged=False, stats=None, jobs=1,
+                     archive=None):
+    """
+    Write the given index entries by seeking straight to their content, so
+    the cost is proportional to the selected bytes, not the bundle size.
+    The directory set is known from the index and created up front. With
+    archive (an ArchiveWriter) the files go into the archive instead. In
+    that case, and with skip_unchanged, only the last entry for a path is
+    written.
+    """
+    if archive is not None:
+        materializer = archive
+        failed_directories = set()
+    else:
+        materializer = Materializer(jobs, skip_unchanged, stats)
+        failed_directories = DirectoryCache().create_all(filename for filename, _, _ in entries)
+    last_entry = None
+    if archive is not None or skip_unchanged:
+        # Position of the entry that wins for each path.
+        last_entry = {filename: position for position, (filename, _, _) in enumerate(entries)}
+    with open(input_file_path, 'rb') as bundle:
+        for position, (filename, offset, length) in enumerate(entries):
+            if last_entry is not None and last_entry[filename] != position:
+                materializer.skip_block(filename)
+                continue
+            if os.path.dirname(filename) in failed_directories:
+                materializer.rejected_blocks.append((filename, "Failed to create directory"))
+                continue
+            bundle.seek(offset)
+            data = bundle.read(length)
+            if len(data) != length:
+                materializer.rejected_blocks.append((filename, "Index points past the end of the bundle"))
+                continue
+            materializer.submit(filename, data)
+    materializer.close()
+    return (len(entries), materializer.successful_extractions,
+            materializer.rejected_blocks, materializer.overwrites)
+
+def iter_bundle_lines(input_file_path, encoding):
+    """
+    Yield the bundle's lines one at a time, without line endings.
+
+    Lines are split as a text-mode read would (\\n, \\r\\n and lone \\r).
+    A line that does not decode with encoding is decoded with the latin-1
+    fallback instead, with a single warning, so detection never needs a
+    second pass over the file.
+    """
+    warned = False
+    with open(input_file_path, 'rb') as f:
+        for raw in f:
+            try:
+                line = raw.decode(encoding)
+            except UnicodeDecodeError:
+                line = raw.decode(FALLBACK_ENCODING)
+                if not warned:
+                    print(f"  Warning: Bundle is not valid {encoding}; "
+                          f"decoding affected lines as {FALLBACK_ENCODING}")
+                    warned = True
+            if line.endswith('\n'):
+                line = line[:-1]
+            if line.endswith('\r'):
+                line = line[:-1]
+            if '\r' in line:
+                yield from line.split('\r')
+            else:
+                yield line
+
+def iter_block_events(lines):
+    """
+    Turn a stream of lines into block events, holding no more than one line.
+
+    Yields ('fence', None) for every opening fence, then either
+    ('start', (filename, marker_line)), any number of ('line', text) and
+    ('end', None), or ('abort', reason) if the bundle ends inside the block.
+    Fences without a usable marker yield ('reject', (block_id, reason)).
+    """
+    in_block = False
+    expect_marker = False
+    for line in lines:
+        if in_block:
+            if closing_fence_pattern.match(line):
+                in_block = False
+                yield 'end', None
+            else:
+                yield 'line', line
+            continue
+        if expect_marker:
+            expect_marker = False
+            marker_match = file_marker_pattern.match(line)
+            if marker_match:
+                in_block = True
+                yield 'start', (normalize_path(marker_match.group(1)), line)
+                continue
+            yield 'reject', ("<unknown>", "Expected a file marker comment after code fence")
+            # The line after the fence may itself open the next block.
+        if code_fence_pattern.match(line):
+            expect_marker = True
+            yield 'fence', None
+    if expect_marker:
+        yield 'reject', ("<unknown>", "Missing file marker after code fence")
+    elif in_block:
+        yield 'abort', "Missing closing code fence"
+
+class BlockSink:
+    """
+    Destination for one block's lines.
+
+    Blank lines are held back as a count, so trailing ones can be dropped
+    without buffering any content.
+    """
+
+    blank_lines = 0
+
+    def write_line(self, line):
+        if line == '':
+            self.blank_lines += 1
+            return
+        text = '\n' * self.blank_lines + line + '\n'
+        self.blank_lines = 0
+        self.write_bytes(text.encode('utf-8'))
+
+class BlockBuffer(BlockSink):
+    """Collect one block in memory so a worker thread can write it."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write_bytes(self, data):
+        self.chunks.append(data)
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+class PendingFile(BlockSink):
+    """
+    Hold one block off-tree until it is complete.
+
+    The block is spooled in memory, spilling to the system temporary
+    directory past BLOCK_SPOOL_SIZE, and hashed as it arrives. Nothing is
+    created next to the target before commit(), so a block that never
+    closes, or one skipped as unchanged, leaves the target's directory
+    untouched. Size and SHA-256 are kept for matches_disk().
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.spool = tempfile.SpooledTemporaryFile(max_size=BLOCK_SPOOL_SIZE)
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def write_bytes(self, data):
+        self.spool.write(data)
+        self.hasher.update(data)
+        self.size += len(data)
+
+    def matches_disk(self):
+        """Return True if the target already holds exactly these bytes."""
+        try:
+            if os.path.getsize(self.filename) != self.size:
+                return False
+            hasher = hashlib.sha256()
+            with open(self.filename, 'rb') as f:
+                while True:
+                    chunk = f.read(COMPARE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+        except OSError:
+            return False
+        return hasher.digest() == self.hasher.digest()
+
+    def commit(self):
+        """Replace the target atomically through a temporary file beside it."""
+        directory, base = os.path.split(self.filename)
+        temp_path = os.path.join(directory, f".{base}.extract-tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                self.spool.seek(0)
+                shutil.copyfileobj(self.spool, f, COMPARE_CHUNK_SIZE)
+            if os.path.exists(self.filename):
+                shutil.copymode(self.filename, temp_path)
+            os.replace(temp_path, self.filename)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            self.spool.close()
+
+    def discard(self):
+        self.spool.close()
+
+def new_extraction_stats():
+    """Return counters for files created, rewritten and left unchanged."""
+    return {'new': 0, 'written': 0, 'unchanged': 0}
+
+def commit_pending(pending, skip_unchanged=False):
+    """
+    Move a finished block into place; return 'new', 'written' or 'unchanged'.
+
+    With skip_unchanged the target is compared first (size, then hash) and
+    left alone when identical, so its mtime and any build caches keyed on it
+    stay valid. Nothing is printed, so this is safe to run in a worker.
+    """
+    existed = os.path.exists(pending.filename)
+    if skip_unchanged and existed and pending.matches_disk():
+        pending.discard()
+        return 'unchanged'
+    pending.commit()
+    return 'written' if existed else 'new'
+
+def write_block_data(filename, data, skip_unchanged=False):
+    """Write a buffered block through a PendingFile (worker entry point)."""
+    pending = PendingFile(filename)
+    try:
+        pending.write_bytes(data)
+    except Exception:
+        pending.discard()
+        raise
+    return commit_pending(pending, skip_unchanged)
+
+class Materializer:
+    """
+    Commit extracted blocks to disk and report the outcome of each.
+
+    With jobs > 1 buffered blocks are written by a bounded thread pool (at
+    most 2 * jobs in flight); outcomes are still reported in submission
+    order, and blocks for the same file are never written concurrently, so
+    warnings, the summary and the final file contents are deterministic.
+    """
+
+    def __init__(self, jobs=1, skip_unchanged=False, stats=None):
+        self.jobs = jobs
+        self.skip_unchanged = skip_unchanged
+        self.stats = stats if stats is not None else new_extraction_stats()
+        self.successful_extractions = 0
+        self.rejected_blocks = []
+        self.overwrites = []
+        self.executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        self.in_flight = deque()
+        self.in_flight_names = Counter()
+
+    def open_block(self, filename):
+        """Return the sink for a new block: streamed to disk, or buffered for the pool."""
+        if self.executor is None:
+            return PendingFile(filename)
+        return BlockBuffer()
+
+    def finish_block(self, filename, sink):
+        if isinstance(sink, PendingFile):
+            self.commit(sink)
+        else:
+            self.submit(filename, sink.getvalue())
+
+    def discard_block(self, sink):
+        if isinstance(sink, PendingFile):
+            sink.discard()
+
+    def skip_block(self, filename):
+        """Account for a block superseded by a later block for the same path."""
+        self.successful_extractions += 1
+        self.overwrites.append(filename)
+        print(f"  Warning: Skipping {filename}: a later block replaces it")
+
+    def commit(self, pending):
+        """Commit a streamed PendingFile in the calling thread."""
+        try:
+            outcome = commit_pending(pending, self.skip_unchanged)
+        except Exception as e:
+            outcome = e
+        self._report(pending.filename, outcome)
+
+    def submit(self, filename, data):
+        """Write a buffered block, in the pool when there is one."""
+        if self.executor is None:
+            try:
+                outcome = write_block_data(filename, data, self.skip_unchanged)
+            except Exception as e:
+                outcome = e
+            self._report(filename, outcome)
+            return
+        while self.in_flight_names[filename]:
+            self._drain_one()
+        future = self.executor.submit(write_block_data, filename, data, self.skip_unchanged)
+        self.in_flight.append((filename, future))
+        self.in_flight_names[filename] += 1
+        while len(self.in_flight) >= 2 * self.jobs:
+            self._drain_one()
+
+    def close(self):
+        while self.in_flight:
+            self._drain_one()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def _drain_one(self):
+        filename, future = self.in_flight.popleft()
+        self.in_flight_names[filename] -= 1
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = e
+        self._report(filename, outcome)
+
+    def _report(self, filename, outcome):
+        if isinstance(outcome, Exception):
+            error_msg = f"Error writing file: {outcome}"
+            print(f"  Failed: {filename} - {error_msg}")
+            self.rejected_blocks.append((filename, error_msg))
+            return
+        self.stats[outcome] += 1
+        self.successful_extractions += 1
+        if outcome == 'unchanged':
+            print(f"Unchanged: {filename}")
+            return
+        if outcome == 'written':
+            self.overwrites.append(filename)
+            print(f"  Warning: Overwriting file: {filename}")
+        print(f"Extracted: {filename}")
+
+def archive_member_name(filename):
+    """Return a safe relative member name for filename, or None."""
+    name = posixpath.normpath(filename.replace('\\', '/'))
+    if name.startswith('/') or name == '..' or name.startswith('../') or name == '.':
+        return None
+    return name
+
+class SpooledBlock(BlockSink):
+    """Collect one block for an archive, spilling to disk when it grows large."""
+
+    def __init__(self):
+        self.spool = tempfile.SpooledTemporaryFile(max_size=BLOCK_SPOOL_SIZE)
+        self.size = 0
+
+    def write_bytes(self, data):
+        self.spool.write(data)
+        self.size += len(data)
+
+    def close(self):
+        self.spool.close()
+
+class ArchiveWriter:
+    """
+    Write extracted blocks straight into a zip or tar archive.
+
+    Takes the place of a Materializer, so a bundle becomes a deployable
+    archive without an intermediate tree on disk. Each block is spooled until
+    its closing fence (a truncated block never reaches the archive, and tar
+    members know their size up front), then written and released. As on
+    disk, the last block for a path wins: extract_files finds each path's
+    last block in a pre-pass and reports the earlier ones through
+    skip_block(), so they never reach the archive. target may be '-' for
+    stdout; both formats are written in streaming mode there, so pipes work.
+    """
+
+    def __init__(self, target, archive_format='zip', stats=None):
+        self.stats = stats if stats is not None else new_extraction_stats()
+        self.successful_extractions = 0
+        self.rejected_blocks = []
+        self.overwrites = []
+        self.names = set()
+        self.date_time = time.localtime()[:6]
+        self.mtime = int(time.time())
+        self.fileobj = open_output(target) if target == '-' else None
+        self.zip = None
+        self.tar = None
+        if archive_format == 'zip':
+            self.zip = zipfile.ZipFile(self.fileobj or target, 'w', zipfile.ZIP_DEFLATED)
+        elif self.fileobj is not None:
+            self.tar = tarfile.open(fileobj=self.fileobj,
+                                    mode='w|gz' if archive_format == 'tar.gz' else 'w|')
+        else:
+            self.tar = tarfile.open(target, 'w:gz' if archive_format == 'tar.gz' else 'w')
+
+    def open_block(self, filename):
+        return SpooledBlock()
+
+    def discard_block(self, sink):
+        sink.close()
+
+    def submit(self, filename, data):
+        sink = SpooledBlock()
+        sink.write_bytes(data)
+        self.finish_block(filename, sink)
+
+    def skip_block(self, filename):
+        """Account for a block superseded by a later block for the same path."""
+        self.successful_extractions += 1
+        self.overwrites.append(filename)
+        print(f"  Warning: Skipping {filename}: a later block replaces it")
+
+    def finish_block(self, filename, sink):
+        try:
+            self._add(filename, sink)
+        finally:
+            sink.close()
+
+    def _add(self, filename, sink):
+        name = archive_member_name(filename)
+        if name is None:
+            print(f"  Failed: {filename} - Unsafe path for an archive member")
+            self.rejected_blocks.append((filename, "Unsafe path for an archive member"))
+            return
+        if name in self.names:
+            # Two spellings of one path, e.g. 'a/x.ts' and 'a/./x.ts'.
+            print(f"  Warning: Duplicate archive member: {name}")
+            self.rejected_blocks.append((filename, "Duplicate archive member"))
+            return
+        sink.spool.seek(0)
+        if self.zip is not None:
+            info = zipfile.ZipInfo(name, self.date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with self.zip.open(info, 'w') as member:
+                shutil.copyfileobj(sink.spool, member)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = sink.size
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self.tar.addfile(info, sink.spool)
+        self.names.add(name)
+        self.stats['new'] += 1
+        self.successful_extractions += 1
+        print(f"Archived: {name}")
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+        else:
+            self.tar.close()
+        if self.fileobj is not None:
+            self.fileobj.close()
+
+def collect_block_paths(input_file_path, encoding):
+    """
+    Return a Counter of complete blocks per file name, reading only markers.
+
+    A block cut off at the end of the bundle is not counted: it never
+    replaces an earlier block for the same path.
+    """
+    counts = Counter()
+    filename = None
+    for event, value in iter_block_events(iter_bundle_lines(input_file_path, encoding)):
+        if event == 'start':
+            filename = value[0]
+        elif event == 'end' and filename:
+            counts[filename] += 1
+    return counts
+
+def extract_files(input_file_path, encoding, skip_unchanged=False, stats=None, jobs=1,
+                  archive=None, select=None):
     """
     Extract files from bundled code blocks with formats like:
 
@@ -75,112 +697,184 @@ def extract_files(input_file_path, encoding):
     This script supports various file types including .js, .ts, and .tsx.
     The first line within the code fence should be a marker comment with the file path.
     It accepts either a "# File:" marker or a "//" style marker.
+
+    With skip_unchanged=True files whose content already matches the block
+    are not rewritten; stats (see new_extraction_stats) counts new, written
+    and unchanged files.
+
+    With jobs > 1 a first pass over the markers collects the directory set,
+    which is created once, and completed blocks are written by a bounded
+    thread pool (see Materializer). Each block is then buffered in memory
+    until its writer picks it up, instead of being streamed to disk.
+
+    With archive (an ArchiveWriter) blocks are streamed into the archive and
+    nothing is created in the working tree. A pre-pass over the markers
+    finds the last block of every path, and earlier blocks for the same path
+    are skipped, so each path becomes a single member. With skip_unchanged
+    the same is done on disk, so only the last block is compared with the
+    existing file.
+
+    select (a list of paths or glob patterns, as for --select) limits the
+    extraction to blocks whose marker path matches; the rest are skipped
+    silently. This is the linear scan used when a bundle has no valid index.
     """
+    selected = path_matcher(select) if select else None
+    if archive is not None:
+        materializer = archive
+    else:
+        materializer = Materializer(jobs, skip_unchanged, stats)
+    directories = DirectoryCache()
     blocks_found = 0
-    successful_extractions = 0
-    rejected_blocks = []
-    overwrites = []
+    rejected_blocks = materializer.rejected_blocks
 
-    # Accept code fence markers for various languages.
-    code_fence_pattern = re.compile(r"^```(?:python|py|ts|tsx|js|jsx|json|prisma|css|mjs|typescript|sql)\s*$")
-    # Support marker lines that start with "# File:" or with "//"
-    file_marker_pattern = re.compile(r"^(?:#\s*File:\s*|//\s*)(.+)$")
-    closing_fence_pattern = re.compile(r"^```\s*$")
-    created_files = set()
+    # The bundle is read as a stream and, serially, every block is spooled
+    # while it is being read, so memory is bounded by BLOCK_SPOOL_SIZE.
+    filename = None
+    sink = None
+    error_msg = None
+    superseded = False
+    unselected = False
+    # Complete blocks still to come per path, when superseded blocks are skipped.
+    remaining = None
 
     try:
-        with open(input_file_path, 'r', encoding=encoding) as f:
-            lines = f.readlines()
-
-        i = 0
-        n = len(lines)
-        while i < n:
-            line = lines[i].rstrip('\r\n')
-            # Look for an opening code fence that matches one of the allowed languages.
-            if code_fence_pattern.match(line):
+        if jobs > 1 or archive is not None or skip_unchanged:
+            block_counts = collect_block_paths(input_file_path, encoding)
+            if jobs > 1 and archive is None:
+                directories.create_all(name for name in block_counts
+                                       if selected is None or selected(name))
+            if archive is not None or skip_unchanged:
+                remaining = block_counts
+
+        for event, value in iter_block_events(iter_bundle_lines(input_file_path, encoding)):
+            if event == 'fence':
                 blocks_found += 1
-                # Must have at least one more line for the file marker
-                if i+1 >= n:
-                    rejected_blocks.append(("<unknown>", "Missing file marker after code fence"))
-                    i += 1
+            elif event == 'reject':
+                rejected_blocks.append(value)
+            elif event == 'start':
+                filename, marker_line = value
+                sink = None
+                error_msg = None
+                superseded = False
+                unselected = False
+                if not filename:
                     continue
-                marker_line = lines[i+1].rstrip('\r\n')
-                marker_match = file_marker_pattern.match(marker_line)
-                if not marker_match:
-                    rejected_blocks.append(("<unknown>", "Expected a file marker comment after code fence"))
-                    i += 1
+                if selected is not None and not selected(filename):
+                    unselected = True
                     continue
-                filename = normalize_path(marker_match.group(1))
-                content_lines = [marker_line]  # Include the marker line as the first line of the file
-
-                # Collect content lines until the closing fence is encountered.
-                j = i+2
-                found_closing = False
-                while j < n:
-                    next_line = lines[j].rstrip('\r\n')
-                    if closing_fence_pattern.match(next_line):
-                        found_closing = True
-                        break
-                    content_lines.append(next_line)
-                    j += 1
-                if not found_closing:
-                    rejected_blocks.append((filename, "Missing closing code fence"))
-                    i = j
+                if remaining is not None and remaining[filename] > 1:
+                    superseded = True
                     continue
+                if archive is None and not directories.ensure(filename):
+                    error_msg = "Failed to create directory"
+                    continue
+                try:
+                    sink = materializer.open_block(filename)
+                    # Include the marker line as the first line of the file
+                    sink.write_line(marker_line)
+                except Exception as e:
+                    error_msg = f"Error writing file: {e}"
+            elif event == 'line':
+                if sink is not None:
+                    sink.write_line(value)
+            elif event == 'abort':
+                if sink is not None:
+                    materializer.discard_block(sink)
+                if not unselected:
+                    rejected_blocks.append((filename, value))
+            elif event == 'end':
                 if not filename:
                     rejected_blocks.append(("<unknown>", "Empty filename in file marker"))
-                    i = j + 1
                     continue
-                if ensure_directory_exists(filename):
-                    if filename in created_files or os.path.exists(filename):
-                        overwrites.append(filename)
-                        print(f"  Warning: Overwriting file: {filename}")
-                    try:
-                        with open(filename, 'w', encoding='utf-8') as output_file:
-                            # Optionally remove trailing blank lines
-                            while content_lines and content_lines[-1] == '':
-                                content_lines.pop()
-                            output_file.write('\n'.join(content_lines) + '\n')
-                        created_files.add(filename)
-                        print(f"Extracted: {filename}")
-                        successful_extractions += 1
-                    except Exception as e:
-                        error_msg = f"Error writing file: {e}"
+                if unselected:
+                    continue
+                if superseded:
+                    remaining[filename] -= 1
+                    materializer.skip_block(filename)
+                    continue
+                if sink is None:
+                    if error_msg != "Failed to create directory":
                         print(f"  Failed: {filename} - {error_msg}")
-                        rejected_blocks.append((filename, error_msg))
-                else:
-                    rejected_blocks.append((filename, "Failed to create directory"))
-                # Advance i to after the closing fence.
-                i = j + 1
-            else:
-                i += 1
+                    rejected_blocks.append((filename, error_msg))
+                    continue
+                materializer.finish_block(filename, sink)
+                sink = None
 
-        return blocks_found, successful_extractions, rejected_blocks, overwrites
+        materializer.close()
+        return (blocks_found, materializer.successful_extractions,
+                rejected_blocks, materializer.overwrites)
 
     except Exception as e:
+        if sink is not None:
+            materializer.discard_block(sink)
         print(f"Error processing input file: {e}")
         sys.exit(1)
 
 def main():
     # Get input file path.
-    input_file_path = get_input_arguments()
+    args = get_input_arguments()
+    if args.archive == '-':
+        # The archive owns stdout; progress messages go to stderr.
+        with redirect_stdout(sys.stderr):
+            run(args)
+    else:
+        run(args)
+
+def run(args):
+    input_file_path = args.input_file
+    stats = new_extraction_stats()
+    archive = None
     print(f"Processing compacted file: {input_file_path}")
 
-    # Validate input file.
-    is_valid, result = is_readable_text_file(input_file_path)
-    if not is_valid:
-        print(f"Error: {result}")
-        sys.exit(1)
-    encoding = result
-    print(f"Input file encoding detected as: {encoding}")
+    entries = None
+    if args.select or args.list:
+        if not os.path.isfile(input_file_path):
+            print(f"Error: File does not exist: {input_file_path}")
+            sys.exit(1)
+        entries = read_bundle_index(input_file_path)
+        if entries is None and args.list:
+            print("Error: Bundle has no valid index; assemble it with --index trailer or "
+                  "--index sidecar.")
+            sys.exit(1)
+        if entries is None:
+            print("  Warning: Bundle has no valid index; scanning it for the selected files")
+    if entries is not None:
+        if args.list:
+            for path, offset, length in entries:
+                print(f"{length:>10}  {path}")
+            return
+        selected = select_index_entries(entries, args.select)
+        print(f"Selected {len(selected)} of {len(entries)} indexed files")
+        if args.archive is not None:
+            archive = ArchiveWriter(args.archive, args.archive_format, stats)
+        blocks_found, successful_extractions, rejected_blocks, overwrites = \
+            extract_selected(input_file_path, selected, args.skip_unchanged, stats, args.jobs,
+                             archive)
+    else:
+        # Validate input file.
+        is_valid, result = is_readable_text_file(input_file_path)
+        if not is_valid:
+            print(f"Error: {result}")
+            sys.exit(1)
+        encoding = result
+        print(f"Input file encoding detected as: {encoding}")
+
+        # Extract files.
+        if args.archive is not None:
+            archive = ArchiveWriter(args.archive, args.archive_format, stats)
+        blocks_found, successful_extractions, rejected_blocks, overwrites = \
+            extract_files(input_file_path, encoding, args.skip_unchanged, stats, args.jobs, archive,
+                          args.select)
 
-    # Extract files.
-    blocks_found, successful_extractions, rejected_blocks, overwrites = extract_files(input_file_path, encoding)
+    if archive is not None:
+        # extract_files/extract_selected have closed it already.
+        print(f"Archive written: {args.archive}")
 
     # Print summary statistics.
     print("\nExtraction complete!")
     print(f"Total code blocks found: {blocks_found}")
     print(f"Files successfully extracted: {successful_extractions}")
+    print(f"  New: {stats['new']}, rewritten: {stats['written']}, unchanged: {stats['unchanged']}")
 
     if rejected_blocks:
         print(f"Blocks rejected: {len(rejected_blocks)}")
@@ -1,74 +1,34 @@
 #!/usr/bin/env python3
-import zipfile
-from pathlib import Path
-import os
+from archive_engine import DOCUMENTATION_ITEMS, PROFILES, build_volumes, scan_profile
 
-# Create minimal essential archive
-workspace = Path("/workspace")
-archive_path = workspace / "Gabriel_Family_Clinic_Essential_Files.zip"
+WORKSPACE = "/workspace"
+PROJECT_DIR = "/workspace/gabriel-family-clinic"
+OUTPUT = "/workspace/Gabriel_Family_Clinic_Complete.zip"
+# The deployment guides at the workspace root, as Documentation/<name>.
+GUIDES_PROFILE = dict(PROFILES['docs'], include=DOCUMENTATION_ITEMS)
 
-print("Creating essential files archive...")
-print("Due to workspace size (3.1GB), creating minimal archive with core files...")
+def main():
+    """Split the full project into volumes under the 25 MB upload limit."""
+    # The full project no longer fits one upload, so it is split into
+    # self-contained volumes under the 25 MB upload limit instead of
+    # shipping a hand-picked subset.
+    print("Creating full project archive volumes...")
 
-essential_files = {
-    # Core Documentation
-    "Project_Architecture_Document.md": "Documentation/",
-    "DEPLOYMENT-ERROR-RESOLUTION-REPORT.md": "Documentation/", 
-    "DOCKER-COMPLETE-PACKAGE.md": "Documentation/",
-    "DOCKER-CONFIGURATION-SUMMARY.md": "Documentation/",
-    "DOCKER-DEPLOYMENT-GUIDE.md": "Documentation/",
-    "VERCEL-DEPLOYMENT-ERROR-FIX.md": "Documentation/",
-    "VERCEL-FIX-DEPLOYMENT-GUIDE.md": "Documentation/",
-    
-    # Core Config Files
-    "gabriel-family-clinic/package.json": "Source/",
-    "gabriel-family-clinic/README.md": "Source/",
-    "gabriel-family-clinic/Dockerfile": "Source/",
-    "gabriel-family-clinic/docker-compose.yml": "Source/",
-    "gabriel-family-clinic/tsconfig.json": "Source/",
-    
-    # Core Source Files (sample)
-    "gabriel-family-clinic/app/layout.tsx": "Source/",
-    "gabriel-family-clinic/app/page.tsx": "Source/",
-    "gabriel-family-clinic/lib/supabase/client.ts": "Source/",
-    "gabriel-family-clinic/lib/supabase/auth.ts": "Source/",
-}
+    entries = (scan_profile(WORKSPACE, GUIDES_PROFILE)
+               + scan_profile(PROJECT_DIR, PROFILES['full'], "gabriel-family-clinic/"))
+    build_volumes(
+        PROJECT_DIR,
+        OUTPUT,
+        25 * 1024 * 1024,
+        profile='full',
+        arc_prefix="gabriel-family-clinic/",
+        jobs=4,
+        entries=entries,
+    )
 
-with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    files_added = 0
-    
-    # Add essential files that exist
-    for source_path, archive_dir in essential_files.items():
-        full_path = workspace / source_path
-        if full_path.exists():
-            archive_name = archive_dir + Path(source_path).name
-            zipf.write(full_path, archive_name)
-            print(f"✓ {source_path}")
-            files_added += 1
-        else:
-            print(f"✗ Missing: {source_path}")
-    
-    # Add some additional key files
-    additional_patterns = [
-        "gabriel-family-clinic/app/*/page.tsx",
-        "gabriel-family-clinic/lib/*/*utils.ts", 
-        "gabriel-family-clinic/supabase/functions/*/index.ts"
-    ]
-    
-    import glob
-    for pattern in additional_patterns:
-        for file_path in glob.glob(str(workspace / pattern)):
-            rel_path = Path(file_path).relative_to(workspace)
-            archive_name = f"Source/{rel_path}"
-            try:
-                zipf.write(Path(file_path), archive_name)
-                print(f"✓ {rel_path}")
-                files_added += 1
-            except:
-                pass
+    print("🎯 Note: Each volume is a complete zip; extract them all into one directory.")
 
-size_mb = archive_path.stat().st_size / (1024*1024)
-print(f"\n📦 Essential archive created!")
-print(f"📊 Size: {size_mb:.2f} MB") 
-print(f"📁 Files: {files_added}")
-print(f"🎯 Note: This contains core files only. Full project available in workspace.")
\ No newline at end of file
+# build_volumes compresses in worker processes, which re-import this module
+# under the spawn start method.
+if __name__ == "__main__":
+    main()
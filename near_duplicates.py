@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Find exact and near-duplicate documents (.md/.txt) so bundles and archives
+can ship one representative per cluster.
+
+Each document is reduced to the set of its SHINGLE_SIZE-word shingles and
+a MinHash signature of NUM_HASHES values (one-permutation hashing with
+rotation densification, so every shingle is hashed only once). Signatures
+are split into BANDS bands for locality-sensitive hashing; documents that
+share a band become candidates, and candidates whose shingle sets have a
+Jaccard similarity of at least the threshold are clustered together.
+Byte-identical documents are clustered first by SHA-256.
+
+Usage:
+    python near_duplicates.py [PATH ...] [--exact] [--threshold 0.8]
+"""
+import re
+import sys
+import hashlib
+import argparse
+from collections import namedtuple
+
+from tree_walker import IgnoreRules, iter_input_paths
+
+DOC_EXTENSIONS = ('.md', '.txt')
+SHINGLE_SIZE = 5
+NUM_HASHES = 128
+BANDS = 32
+ROWS = NUM_HASHES // BANDS
+DEFAULT_THRESHOLD = 0.8
+WORD_PATTERN = re.compile(r'\w+')
+# Added per bin of distance when an empty bin borrows a neighbour's value,
+# so borrowed values stay distinct from the neighbour's own.
+DENSIFY_OFFSET = 2 ** 64 // NUM_HASHES + 1
+
+# keep is the representative that ships; drop lists the paths it stands for.
+DuplicateCluster = namedtuple('DuplicateCluster', ['keep', 'drop', 'exact', 'saved'])
+
+def is_document(path):
+    return path.lower().endswith(DOC_EXTENSIONS)
+
+def shingle_hashes(text):
+    """Return the set of 64-bit hashes of the word shingles of text."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = (' '.join(words[i:i + SHINGLE_SIZE])
+                    for i in range(len(words) - SHINGLE_SIZE + 1))
+    return {int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(),
+                           'little')
+            for shingle in shingles}
+
+def minhash_signature(hashes):
+    """Return the NUM_HASHES-value one-permutation MinHash of a hash set (None if empty)."""
+    if not hashes:
+        return None
+    bins = [None] * NUM_HASHES
+    for value in hashes:
+        index = value % NUM_HASHES
+        value //= NUM_HASHES
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    signature = list(bins)
+    for index in range(NUM_HASHES):
+        if bins[index] is None:
+            # Rotation densification: borrow from the next non-empty bin.
+            distance = 1
+            while bins[(index + distance) % NUM_HASHES] is None:
+                distance += 1
+            signature[index] = bins[(index + distance) % NUM_HASHES] + distance * DENSIFY_OFFSET
+    return signature
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class Document:
+    """A document's size, content hash, shingle set and MinHash signature."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.size = len(data)
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.shingles = shingle_hashes(data.decode('utf-8', errors='replace'))
+        self.signature = minhash_signature(self.shingles)
+
+def representative_key(document):
+    """Keep the largest document of a cluster; ties go to the shortest, then first path."""
+    return (-document.size, len(document.path), document.path)
+
+def union_find_groups(items, pairs):
+    parent = {item: item for item in items}
+
+    def find(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+    groups = {}
+    for item in items:
+        groups.setdefault(find(item), []).append(item)
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicates(paths, mode='near', threshold=DEFAULT_THRESHOLD):
+    """
+    Return DuplicateCluster objects for the documents among paths.
+
+    mode='exact' only clusters byte-identical documents; mode='near' also
+    merges documents whose shingle Jaccard similarity reaches threshold.
+    Paths that are not documents, or cannot be read, are never clustered.
+    """
+    documents = {}
+    for path in paths:
+        if not is_document(path):
+            continue
+        try:
+            documents[path] = Document(path)
+        except OSError as e:
+            print(f"  Skipped: {path} - {e}", file=sys.stderr)
+
+    by_digest = {}
+    for document in documents.values():
+        by_digest.setdefault(document.digest, []).append(document.path)
+    pairs = [(group[0], other) for group in by_digest.values() for other in group[1:]]
+
+    if mode == 'near':
+        # One document per exact group takes part in LSH.
+        unique = [documents[group[0]] for group in by_digest.values()]
+        buckets = {}
+        for document in unique:
+            if document.signature is None:
+                continue
+            for band in range(BANDS):
+                key = (band, tuple(document.signature[band * ROWS:(band + 1) * ROWS]))
+                buckets.setdefault(key, []).append(document)
+        checked = set()
+        for bucket in buckets.values():
+            for i, a in enumerate(bucket):
+                for b in bucket[i + 1:]:
+                    pair = (a.path, b.path)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if jaccard(a.shingles, b.shingles) >= threshold:
+                        pairs.append(pair)
+
+    clusters = []
+    for group in union_find_groups(list(documents), pairs):
+        members = sorted((documents[path] for path in group), key=representative_key)
+        keep = members[0]
+        drop = [member.path for member in members[1:]]
+        exact = all(member.digest == keep.digest for member in members)
+        saved = sum(member.size for member in members[1:])
+        clusters.append(DuplicateCluster(keep.path, drop, exact, saved))
+    clusters.sort(key=lambda cluster: -cluster.saved)
+    return clusters
+
+def duplicate_paths(paths, mode='near', threshold=DEFAULT_THRESHOLD):
+    """Return (set of paths to leave out, bytes saved, clusters) for a dedupe filter."""
+    clusters = find_duplicates(paths, mode, threshold)
+    dropped = {path for cluster in clusters for path in cluster.drop}
+    return dropped, sum(cluster.saved for cluster in clusters), clusters
+
+def print_clusters(clusters, stream=None):
+    stream = stream or sys.stdout
+    for cluster in clusters:
+        kind = 'exact' if cluster.exact else 'near'
+        print(f"{kind} cluster, keeping {cluster.keep} ({cluster.saved / 1024:.1f} KB saved)",
+              file=stream)
+        for path in cluster.drop:
+            print(f"  - {path}", file=stream)
+    dropped = sum(len(cluster.drop) for cluster in clusters)
+    saved = sum(cluster.saved for cluster in clusters)
+    print(f"\n{len(clusters)} clusters, {dropped} duplicate documents, "
+          f"{saved / 1024:.1f} KB saved", file=stream)
+
+def main():
+    parser = argparse.ArgumentParser(description="Find exact and near-duplicate documents.")
+    parser.add_argument('paths', nargs='*', default=['.'],
+                        help="files, directories or globs to scan (default: .)")
+    parser.add_argument('--exact', action='store_true', help="only report byte-identical documents")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Jaccard similarity for near duplicates (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    paths = list(iter_input_paths(args.paths, IgnoreRules.from_files('.', ('.gitignore',))))
+    clusters = find_duplicates(paths, 'exact' if args.exact else 'near', args.threshold)
+    print_clusters(clusters)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Content-addressed snapshot store for project trees.
+
+Instead of keeping app.zip, app_2.zip, ... side by side, every file blob is
+stored once under .snapshots/objects keyed by its SHA-256, and each snapshot
+is a small JSON manifest mapping paths to blob hashes. Taking a snapshot of
+an unchanged tree adds only the manifest, so the store grows with the volume
+of change rather than with the number of snapshots.
+
+Usage:
+    python snapshot_store.py take NAME SOURCE      (SOURCE: directory or .zip)
+    python snapshot_store.py list
+    python snapshot_store.py diff OLD NEW
+    python snapshot_store.py materialize NAME DEST
+    python snapshot_store.py export NAME OUTPUT.zip
+"""
+import os
+import stat
+import sys
+import json
+import time
+import zlib
+import hashlib
+import zipfile
+import argparse
+
+from archive_utils import ZIP_EPOCH, safe_target
+from tree_walker import IgnoreRules, walk_files
+
+DEFAULT_STORE_DIR = '.snapshots'
+SNAPSHOT_VERSION = 2
+# Permissions recorded when a source does not carry any (e.g. zips from Windows).
+DEFAULT_MODE = 0o644
+# Blobs are zlib-compressed on disk, like git loose objects.
+BLOB_LEVEL = 6
+READ_SIZE = 1024 * 1024
+
+class SnapshotStore:
+    """Blob objects plus one manifest per snapshot, rooted at store_dir."""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self.snapshots_dir = os.path.join(store_dir, 'snapshots')
+
+    def blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has_blob(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def put_blob(self, data):
+        """Store data once; return (digest, stored) where stored is False for a known blob."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(data, BLOB_LEVEL))
+        os.replace(temp_path, path)
+        return digest, True
+
+    def get_blob(self, digest):
+        with open(self.blob_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def manifest_path(self, name):
+        """Return the manifest path of snapshot name, exiting if name is not a plain name."""
+        if not name or '/' in name or os.sep in name or '..' in name:
+            print(f"Error: Invalid snapshot name '{name}'.")
+            sys.exit(1)
+        return os.path.join(self.snapshots_dir, name + '.json')
+
+    def snapshot_names(self):
+        try:
+            names = os.listdir(self.snapshots_dir)
+        except OSError:
+            return []
+        return sorted(name[:-len('.json')] for name in names if name.endswith('.json'))
+
+    def load(self, name):
+        """Return the manifest of snapshot name, exiting if it does not exist."""
+        try:
+            with open(self.manifest_path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except OSError:
+            print(f"Error: Snapshot '{name}' does not exist in {self.store_dir}.")
+            sys.exit(1)
+
+    def save(self, manifest):
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        path = self.manifest_path(manifest['name'])
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(temp_path, path)
+
+    def take(self, name, source):
+        """
+        Record source (a directory or a zip file) as snapshot name.
+
+        Returns (manifest, new_blobs, new_bytes): how many blobs and how many
+        uncompressed bytes this snapshot actually added to the store.
+        """
+        # Reject a bad name before any blob is written.
+        self.manifest_path(name)
+        if os.path.isdir(source):
+            members = iter_directory_members(source, self.store_dir)
+        elif zipfile.is_zipfile(source):
+            members = iter_zip_members(source)
+        else:
+            print(f"Error: '{source}' is neither a directory nor a zip file.")
+            sys.exit(1)
+
+        files = {}
+        new_blobs = 0
+        new_bytes = 0
+        for path, data, mtime, mode in members:
+            digest, stored = self.put_blob(data)
+            if stored:
+                new_blobs += 1
+                new_bytes += len(data)
+            files[path] = {'sha256': digest, 'size': len(data), 'mtime': mtime, 'mode': mode}
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'name': name,
+            'source': source,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'files': files,
+        }
+        self.save(manifest)
+        return manifest, new_blobs, new_bytes
+
+    def store_size(self):
+        """Return the bytes the store occupies on disk."""
+        total = 0
+        for directory, _, names in os.walk(self.store_dir):
+            for name in names:
+                total += os.path.getsize(os.path.join(directory, name))
+        return total
+
+def iter_directory_members(root, store_dir=None):
+    """
+    Yield (posix path, bytes, mtime, mode) for every file below root that git
+    would track. Only .gitignore applies: .dockerignore leaves out files a
+    snapshot of the real tree must keep. store_dir is pruned when it lies
+    below root, so a snapshot never contains the store itself.
+    """
+    rules = IgnoreRules.from_files(root, ('.gitignore',))
+    if store_dir is not None:
+        store_rel = os.path.relpath(os.path.realpath(store_dir), os.path.realpath(root))
+        if store_rel not in (os.curdir, os.pardir) and not store_rel.startswith(os.pardir + os.sep):
+            rules.add('/' + store_rel.replace(os.sep, '/') + '/')
+    for path in walk_files(root, rules):
+        with open(path, 'rb') as f:
+            data = f.read()
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        st = os.stat(path)
+        yield rel, data, st.st_mtime, stat.S_IMODE(st.st_mode)
+
+def iter_zip_members(zip_path):
+    """Yield (member name, bytes, mtime, mode) for every file member of a zip."""
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        for info in zipf.infolist():
+            if info.is_dir():
+                continue
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            mode = stat.S_IMODE(info.external_attr >> 16) or DEFAULT_MODE
+            yield info.filename, zipf.read(info), mtime, mode
+
+def diff_manifests(old, new):
+    """Return (added, removed, modified) path lists between two manifests."""
+    old_files = old['files']
+    new_files = new['files']
+    added = sorted(set(new_files) - set(old_files))
+    removed = sorted(set(old_files) - set(new_files))
+    modified = sorted(path for path in set(old_files) & set(new_files)
+                      if old_files[path]['sha256'] != new_files[path]['sha256'])
+    return added, removed, modified
+
+def materialize(store, name, dest):
+    """Write every file of snapshot name below dest and restore its mode and mtime."""
+    manifest = store.load(name)
+    count = 0
+    for path, entry in sorted(manifest['files'].items()):
+        target = safe_target(dest, path)
+        if target is None:
+            print(f"  Skipped unsafe path: {path}")
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(store.get_blob(entry['sha256']))
+        # Version 1 manifests did not record the mode.
+        os.chmod(target, entry.get('mode', DEFAULT_MODE))
+        os.utime(target, (entry['mtime'], entry['mtime']))
+        count += 1
+    print(f"Materialized {count} files from '{name}' into {dest}")
+
+def export_zip(store, name, output, compresslevel=6):
+    """Write snapshot name to a zip archive built from the stored blobs."""
+    manifest = store.load(name)
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zipf:
+        for path, entry in sorted(manifest['files'].items()):
+            mtime = max(entry['mtime'], ZIP_EPOCH)
+            info = zipfile.ZipInfo(path, date_time=time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = (stat.S_IFREG | entry.get('mode', DEFAULT_MODE)) << 16
+            zipf.writestr(info, store.get_blob(entry['sha256']))
+    print(f"Exported '{name}' ({len(manifest['files'])} files) to {output}")
+
+def print_snapshot_list(store):
+    names = store.snapshot_names()
+    if not names:
+        print(f"No snapshots in {store.store_dir}")
+        return
+    logical = 0
+    for name in names:
+        manifest = store.load(name)
+        size = sum(entry['size'] for entry in manifest['files'].values())
+        logical += size
+        print(f"{name:<24} {len(manifest['files']):>6} files {size / 1024:>10.1f} KB  "
+              f"{manifest['created']}  {manifest['source']}")
+    print(f"\n{len(names)} snapshots, {logical / (1024 * 1024):.2f} MB of files, "
+          f"{store.store_size() / (1024 * 1024):.2f} MB on disk")
+
+def print_diff(store, old_name, new_name):
+    added, removed, modified = diff_manifests(store.load(old_name), store.load(new_name))
+    for path in added:
+        print(f"A {path}")
+    for path in removed:
+        print(f"D {path}")
+    for path in modified:
+        print(f"M {path}")
+    print(f"\n{len(added)} added, {len(removed)} removed, {len(modified)} modified")
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed snapshots of project trees.")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR,
+                        help=f"store directory (default: {DEFAULT_STORE_DIR})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    take = commands.add_parser('take', help="record a directory or zip as a snapshot")
+    take.add_argument('name')
+    take.add_argument('source', help="directory or zip file")
+
+    commands.add_parser('list', help="list snapshots and store usage")
+
+    diff = commands.add_parser('diff', help="show files added, removed or modified between snapshots")
+    diff.add_argument('old')
+    diff.add_argument('new')
+
+    mat = commands.add_parser('materialize', help="write a snapshot's files into a directory")
+    mat.add_argument('name')
+    mat.add_argument('dest')
+
+    export = commands.add_parser('export', help="write a snapshot as a zip archive")
+    export.add_argument('name')
+    export.add_argument('output')
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.store)
+    if args.command == 'take':
+        manifest, new_blobs, new_bytes = store.take(args.name, args.source)
+        print(f"Snapshot '{args.name}': {len(manifest['files'])} files, "
+              f"{new_blobs} new blobs ({new_bytes / 1024:.1f} KB)")
+    elif args.command == 'list':
+        print_snapshot_list(store)
+    elif args.command == 'diff':
+        print_diff(store, args.old, args.new)
+    elif args.command == 'materialize':
+        materialize(store, args.name, args.dest)
+    elif args.command == 'export':
+        export_zip(store, args.name, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for comparing zip releases in archive_diff.py
+"""
+
+import sys
+import zipfile
+
+import pytest
+
+import archive_diff
+from archive_diff import diff_directories, read_central_directory
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr('app/', '')
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    return str(path)
+
+OLD_MEMBERS = {
+    'app/page.tsx': "export default function Page() {}\n",
+    'app/layout.tsx': "export const metadata = {}\n",
+    'lib/utils.ts': "export const clinic = 'Gabriel'\n",
+}
+
+def test_diff_classifies_members(tmp_path):
+    old = write_zip(tmp_path / "old.zip", OLD_MEMBERS)
+    new = write_zip(tmp_path / "new.zip", {
+        'app/page.tsx': "export default function Page() { return null }\n",
+        # Same size, different bytes: only the CRC tells them apart.
+        'lib/utils.ts': "export const clinic = 'Gabrial'\n",
+        'lib/format.ts': "export const format = (x) => x\n",
+    })
+
+    assert diff_directories(read_central_directory(old), read_central_directory(new)) == \
+        (['lib/format.ts'], ['app/layout.tsx'], ['app/page.tsx', 'lib/utils.ts'])
+
+def test_strip_prefix_matches_renamed_roots(tmp_path):
+    old = write_zip(tmp_path / "old.zip", OLD_MEMBERS)
+    new = write_zip(tmp_path / "new.zip", {'clinic/' + name: data
+                                           for name, data in OLD_MEMBERS.items()})
+
+    assert diff_directories(read_central_directory(old),
+                            read_central_directory(new, ['clinic/'])) == ([], [], [])
+
+def run_main(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, 'argv', ['archive_diff.py', *args])
+    try:
+        archive_diff.main()
+    except SystemExit as e:
+        return e.code, capsys.readouterr().out
+    return 0, capsys.readouterr().out
+
+def test_exit_code_is_zero_only_when_archives_match(tmp_path, monkeypatch, capsys):
+    old = write_zip(tmp_path / "old.zip", OLD_MEMBERS)
+    same = write_zip(tmp_path / "same.zip", OLD_MEMBERS)
+    changed = write_zip(tmp_path / "changed.zip", dict(OLD_MEMBERS, **{'app/page.tsx': "x\n"}))
+
+    code, out = run_main(monkeypatch, capsys, old, same)
+    assert code == 0
+    assert "0 added, 0 removed, 0 modified, 3 unchanged" in out
+
+    code, out = run_main(monkeypatch, capsys, old, changed, '--content')
+    assert code == 1
+    assert "M app/page.tsx" in out
+    assert "+x" in out
+
+@pytest.mark.parametrize('name', ['missing.zip', 'not-a-zip.zip'])
+def test_unreadable_archive_exits(tmp_path, name):
+    (tmp_path / "not-a-zip.zip").write_text("not a zip")
+
+    with pytest.raises(SystemExit) as raised:
+        read_central_directory(str(tmp_path / name))
+    assert raised.value.code == 1
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Tests for building, updating and verifying archives in archive_engine.py
+"""
+
+import os
+import sys
+import errno
+import gzip
+import struct
+import zipfile
+import tracemalloc
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+
+import pytest
+
+import archive_engine
+import minimal_archive
+import update_archive_final
+from archive_engine import (COPY_CHUNK_SIZE, GZIP_BLOCK_SIZE, MEMBER_SPOOL_SIZE, PROFILES,
+                            ArchiveEntry, ParallelGzipWriter, build_archive, build_volumes,
+                            pack_volumes, update_archive)
+from snapshot_store import SnapshotStore
+from tests_helpers import make_tree, quietly, read_members
+
+def test_update_matches_fresh_build(tmp_path):
+    root = tmp_path / "src"
+    make_tree(root)
+    updated = str(tmp_path / "updated.zip")
+    quietly(build_archive, str(root), updated, 'full', 'clinic/')
+
+    (root / "app" / "page.tsx").write_text("export default function Page() { return null }\n")
+    (root / "lib" / "format.ts").write_text("export const format = (x) => x\n")
+    (root / "app" / "layout.tsx").unlink()
+    report = quietly(update_archive, str(root), updated, 'full', 'clinic/')
+
+    fresh = str(tmp_path / "fresh.zip")
+    quietly(build_archive, str(root), fresh, 'full', 'clinic/')
+    assert read_members(updated) == read_members(fresh)
+    assert (report['copied'], report['compressed'], report['removed']) == (2, 2, 1)
+
+def test_update_checks_crc_when_size_and_mtime_match(tmp_path):
+    root = tmp_path / "src"
+    make_tree(root)
+    output = str(tmp_path / "app.zip")
+    quietly(build_archive, str(root), output, 'full')
+
+    utils = root / "lib" / "utils.ts"
+    st = utils.stat()
+    utils.write_text("export const clinic = 'Gabrial'\n" * 100)
+    os.utime(utils, ns=(st.st_atime_ns, st.st_mtime_ns))
+    report = quietly(update_archive, str(root), output, 'full')
+
+    assert read_members(output)["lib/utils.ts"] == utils.read_bytes()
+    assert report['compressed'] == 1
+
+def test_build_peak_memory_is_bounded(tmp_path):
+    """A member larger than MEMBER_SPOOL_SIZE must be spilled, not held whole"""
+    root = tmp_path / "src"
+    root.mkdir()
+    big = root / "backup.bin"
+    with open(big, 'wb') as f:
+        for _ in range(32):
+            f.write(os.urandom(1024 * 1024))
+    output = tmp_path / "app.zip"
+
+    tracemalloc.start()
+    quietly(build_archive, str(root), str(output), 'full')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert read_members(output)["backup.bin"] == big.read_bytes()
+    assert peak < MEMBER_SPOOL_SIZE + 4 * COPY_CHUNK_SIZE
+
+def test_stdout_archive_keeps_report_out(tmp_path, capfdbinary):
+    root = tmp_path / "src"
+    make_tree(root)
+    output = tmp_path / "app.zip"
+
+    build_archive(str(root), '-', 'full', verbose=True)
+    out, err = capfdbinary.readouterr()
+    quietly(build_archive, str(root), str(output), 'full')
+
+    assert out == output.read_bytes()
+    assert b"app/page.tsx" in err
+
+@pytest.mark.parametrize('jobs', [1, 2])
+@pytest.mark.parametrize('archive_format', ['zip', 'tar.gz'])
+def test_reproducible_build_ignores_mtime_and_mode(tmp_path, archive_format, jobs):
+    root = tmp_path / "src"
+    make_tree(root)
+    first = tmp_path / f"first.{archive_format}"
+    quietly(build_archive, str(root), str(first), 'full', jobs=jobs, reproducible=True)
+
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            os.utime(path, (1700000000, 1700000000))
+            os.chmod(path, 0o600)
+    second = tmp_path / f"second.{archive_format}"
+    quietly(build_archive, str(root), str(second), 'full', jobs=jobs, reproducible=True)
+
+    assert first.read_bytes() == second.read_bytes()
+
+def test_include_item_prefix(tmp_path):
+    root = tmp_path / "workspace"
+    make_tree(root / "clinic")
+    (root / "DOCKER-DEPLOYMENT-GUIDE.md").write_text("# Docker\n")
+    profile = dict(PROFILES['full'], include=['clinic/lib', ('DOCKER-DEPLOYMENT-GUIDE.md',
+                                                             'Documentation/')])
+    output = str(tmp_path / "app.zip")
+    quietly(build_archive, str(root), output, profile, 'release/')
+
+    assert sorted(read_members(output)) == ['release/Documentation/DOCKER-DEPLOYMENT-GUIDE.md',
+                                            'release/clinic/lib/utils.ts']
+
+def test_pack_volumes_first_fit_decreasing(tmp_path):
+    root = tmp_path / "src"
+    root.mkdir()
+    entries = []
+    for name, size in [('a.bin', 600), ('b.bin', 300), ('c.bin', 500), ('d.bin', 400)]:
+        (root / name).write_bytes(os.urandom(size * 1024))
+        entries.append(ArchiveEntry(str(root / name), name, (root / name).stat()))
+    volumes = pack_volumes(entries, 1024 * 1024)
+
+    # a and c cannot share a volume; b fills the space a leaves.
+    assert [[entry.arcname for entry in volume] for volume in volumes] == \
+        [['a.bin', 'b.bin'], ['c.bin', 'd.bin']]
+
+def test_volumes_stay_within_budget(tmp_path):
+    root = tmp_path / "src"
+    make_tree(root)
+    for index in range(12):
+        (root / "public" / f"photo{index}.jpg").write_bytes(os.urandom(40 * 1024))
+    budget = 128 * 1024
+    volumes = quietly(build_volumes, str(root), str(tmp_path / "app.zip"), budget)
+
+    assert len(volumes) > 1
+    members = {}
+    for path, report in volumes:
+        assert os.path.getsize(path) == report['archive_size'] <= budget
+        members.update(read_members(path))
+    fresh = str(tmp_path / "fresh.zip")
+    quietly(build_archive, str(root), fresh, 'full')
+    assert members == read_members(fresh)
+
+def test_volumes_remove_only_stale_volumes(tmp_path):
+    root = tmp_path / "src"
+    make_tree(root)
+    output = tmp_path / "vol.zip"
+    for name in ["vol.part01.zip", "vol.part07.zip", "vol.parts.zip", "vol.part1.zip",
+                 "vol.part01.zip.bak", "vol.part02x.zip"]:
+        (tmp_path / name).write_bytes(b"old")
+    volumes = quietly(build_volumes, str(root), str(output), 1024 * 1024)
+
+    assert [os.path.basename(path) for path, _ in volumes] == ["vol.part01.zip"]
+    assert sorted(os.listdir(tmp_path)) == ["src", "vol.part01.zip", "vol.part01.zip.bak",
+                                            "vol.part02x.zip", "vol.part1.zip", "vol.parts.zip"]
+    assert (tmp_path / "vol.parts.zip").read_bytes() == b"old"
+
+def test_gzip_blocks_do_not_depend_on_jobs():
+    def compress(data, jobs):
+        out = BytesIO()
+        writer = ParallelGzipWriter(out, jobs, mtime=0)
+        writer.write(data)
+        writer.close()
+        return out.getvalue()
+
+    data = os.urandom(GZIP_BLOCK_SIZE) * 2
+    assert compress(data, 1) == compress(data, 2)
+    assert gzip.decompress(compress(data, 1)) == data
+    assert compress(b'', 1) == compress(b'', 2)
+    assert gzip.decompress(compress(b'', 2)) == b''
+
+class FullDisk:
+    """File object that fails with ENOSPC once limit bytes have been written."""
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def write(self, data):
+        self.limit -= len(data)
+        if self.limit < 0:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+        return len(data)
+
+    def flush(self):
+        pass
+
+@pytest.mark.parametrize('archive_format', ['zip', 'tar'])
+def test_write_errors_end_the_build(tmp_path, archive_format):
+    root = tmp_path / "src"
+    make_tree(root)
+    out = StringIO()
+    with redirect_stdout(out), pytest.raises(OSError) as raised:
+        build_archive(str(root), FullDisk(1024), 'full', archive_format=archive_format,
+                      verbose=True)
+
+    assert raised.value.errno == errno.ENOSPC
+    assert "Skipped" not in out.getvalue()
+
+def run_verify(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, 'argv', ['archive_engine.py', 'verify', *args])
+    try:
+        archive_engine.main()
+    except SystemExit as e:
+        return e.code, capsys.readouterr().out
+    return 0, capsys.readouterr().out
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_verify_clean_archive(tmp_path, monkeypatch, capsys, jobs):
+    root = tmp_path / "src"
+    make_tree(root)
+    output = str(tmp_path / "app.zip")
+    quietly(build_archive, str(root), output, 'full')
+
+    code, out = run_verify(monkeypatch, capsys, output, '--profile', 'full', '--root', str(root),
+                           '--jobs', jobs)
+    assert code == 0
+    assert "Members: 4, problems: 0" in out
+    assert "Archive OK" in out
+
+def test_verify_reports_corrupt_member(tmp_path, monkeypatch, capsys):
+    root = tmp_path / "src"
+    make_tree(root)
+    output = tmp_path / "app.zip"
+    quietly(build_archive, str(root), str(output), 'full')
+    with zipfile.ZipFile(output) as zipf:
+        info = zipf.getinfo('lib/utils.ts')
+    data = bytearray(output.read_bytes())
+    name_length, extra_length = struct.unpack('<HH', data[info.header_offset + 26:
+                                                          info.header_offset + 30])
+    data[info.header_offset + 30 + name_length + extra_length + 4] ^= 0xff
+    output.write_bytes(bytes(data))
+
+    code, out = run_verify(monkeypatch, capsys, str(output))
+    assert code == 1
+    assert "corrupt" in out and "lib/utils.ts" in out
+    assert "Members: 4, problems: 1" in out
+
+def test_verify_against_manifest(tmp_path, monkeypatch, capsys):
+    root = tmp_path / "src"
+    make_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+    quietly(store.take, 'release', str(root))
+    (root / "app" / "page.tsx").write_text("export default function Page() { return null }\n")
+    (root / "app" / "layout.tsx").unlink()
+    (root / "lib" / "format.ts").write_text("export const format = (x) => x\n")
+    output = str(tmp_path / "app.zip")
+    quietly(build_archive, str(root), output, 'full', 'clinic/')
+
+    code, out = run_verify(monkeypatch, capsys, output, '--manifest',
+                           store.manifest_path('release'), '--prefix', 'clinic/')
+    assert code == 1
+    assert "  stale: clinic/app/page.tsx" in out
+    assert "  missing: clinic/app/layout.tsx" in out
+    assert "  extra: clinic/lib/format.ts" in out
+    assert "problems: 3" in out
+
+    quietly(store.take, 'current', str(root))
+    code, out = run_verify(monkeypatch, capsys, output, '--manifest',
+                           store.manifest_path('current'), '--prefix', 'clinic/')
+    assert code == 0
+
+def legacy_build_fixed_members(source_dir):
+    """The member names update_archive_final.py's original os.walk produced."""
+    names = set()
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if d not in ['node_modules', '.next', '.git']]
+        for file in files:
+            file_path = os.path.join(root, file)
+            if any(skip in file_path for skip in ['.log', '.tmp', '.cache']):
+                continue
+            names.add(os.path.relpath(file_path, source_dir).replace(os.sep, '/'))
+    return names
+
+def test_build_fixed_refresh_keeps_member_set(tmp_path, monkeypatch):
+    root = tmp_path / "gabriel-family-clinic"
+    make_tree(root)
+    for rel_path in ["design-system/utilities.ts", "supabase/migrations/001.sql", "Dockerfile",
+                     "docker-compose.yml", "instrumentation.ts", "jest.config.js",
+                     ".eslintrc.json", "docs/setup.md", "dist/server.js", "coverage/lcov.info",
+                     "__pycache__/x.pyc", ".env.local", "lib/app.logger.ts", "npm-debug.log",
+                     ".cache/swc/a.bin", "node_modules/react/index.js", ".next/build.js",
+                     ".git/HEAD", "app/.DS_Store"]:
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_text("x\n")
+    (root / ".gitignore").write_text("dist/\n.env*\n")
+    output = tmp_path / "Gabriel_Family_Clinic_BUILD_FIXED.zip"
+    update = archive_engine.update_archive
+    monkeypatch.setattr(archive_engine, 'update_archive', lambda source, archive, **kwargs:
+                        update(str(root), str(output), **kwargs))
+
+    assert quietly(update_archive_final.update_archive)
+    assert set(read_members(output)) == legacy_build_fixed_members(str(root))
+    assert 'design-system/utilities.ts' in read_members(output)
+
+def test_minimal_archive_volumes_ship_the_guides(tmp_path, monkeypatch):
+    workspace = tmp_path / "workspace"
+    make_tree(workspace / "gabriel-family-clinic")
+    (workspace / "DOCKER-DEPLOYMENT-GUIDE.md").write_text("# Docker\n")
+    (workspace / "notes.md").write_text("# Not a guide\n")
+    monkeypatch.setattr(minimal_archive, 'WORKSPACE', str(workspace))
+    monkeypatch.setattr(minimal_archive, 'PROJECT_DIR', str(workspace / "gabriel-family-clinic"))
+    monkeypatch.setattr(minimal_archive, 'OUTPUT', str(tmp_path / "Complete.zip"))
+
+    quietly(minimal_archive.main)
+
+    members = {}
+    for path in sorted(tmp_path.glob("Complete.part*.zip")):
+        members.update(read_members(path))
+    assert sorted(members) == ['Documentation/DOCKER-DEPLOYMENT-GUIDE.md',
+                               'gabriel-family-clinic/app/layout.tsx',
+                               'gabriel-family-clinic/app/page.tsx',
+                               'gabriel-family-clinic/lib/utils.ts',
+                               'gabriel-family-clinic/public/logo.png']
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the bundle assembler in assemble_code_files.py
+"""
+
+import os
+import json
+import tracemalloc
+from io import StringIO
+
+import pytest
+
+import assemble_code_files
+from assemble_code_files import (BLOCK_FOOTER, CHUNK_SIZE, block_header, manifest_path_for,
+                                 process_files)
+
+def write_list(tmp_path, paths):
+    list_path = tmp_path / "files.txt"
+    list_path.write_text("\n".join(str(p) for p in paths) + "\n", encoding='utf-8')
+    return list_path
+
+def test_stream_matches_buffered_output(tmp_path):
+    """--stream must produce the same bundle bytes as the buffered path"""
+    source = tmp_path / "page.tsx"
+    source.write_bytes("export const title = 'Clinic – café'\r\n".encode('utf-8') * 5000)
+    binary = tmp_path / "logo.png"
+    binary.write_bytes(b"\x89PNG\0\0")
+    list_path = write_list(tmp_path, [source, binary])
+
+    process_files(str(list_path), str(tmp_path / "buffered.md"))
+    process_files(str(list_path), str(tmp_path / "streamed.md"), streaming=True)
+
+    assert (tmp_path / "buffered.md").read_bytes() == (tmp_path / "streamed.md").read_bytes()
+
+def test_stream_peak_memory_is_bounded(tmp_path):
+    """Peak traced memory in --stream mode must not grow with file size"""
+    big = tmp_path / "migration.sql"
+    line = "INSERT INTO appointments VALUES (1, 'Gabriel Family Clinic');\n"
+    with open(big, 'w', encoding='utf-8') as f:
+        for _ in range(32 * 1024 * 1024 // len(line)):
+            f.write(line)
+    list_path = write_list(tmp_path, [big])
+    output = tmp_path / "bundle.md"
+
+    assemble_code_files.log_stream = open(os.devnull, 'w')
+    try:
+        tracemalloc.start()
+        process_files(str(list_path), str(output), streaming=True)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        assemble_code_files.log_stream.close()
+        assemble_code_files.log_stream = None
+
+    assert output.stat().st_size > big.stat().st_size
+    # A decoded chunk is at most 4 bytes per character, encoded once more for
+    # the output; everything beyond that is fixed overhead.
+    assert peak < 16 * CHUNK_SIZE
+
+def test_late_invalid_utf8_is_rejected(tmp_path):
+    """Encoding is picked from the first 8 KiB, as before; a later bad byte rejects the file"""
+    source = tmp_path / "notes.md"
+    source.write_bytes("é".encode('utf-8') * 5000 + b"\xff\n")
+    list_path = write_list(tmp_path, [source])
+
+    for streaming in (False, True):
+        count, rejected = process_files(str(list_path), str(tmp_path / "bundle.md"),
+                                        streaming=streaming)
+        assert count == 0
+        assert [path for path, _ in rejected] == [str(source)]
+        assert "utf-8" in rejected[0][1]
+
+def test_parallel_duplicates_hit_the_cache(tmp_path):
+    """A path listed many times is probed once, even when threads race for it"""
+    source = tmp_path / "page.tsx"
+    source.write_text("export const page = 1\n" * 200000, encoding='utf-8')
+    list_path = write_list(tmp_path, [source] * 16)
+    prober = assemble_code_files.FileProber()
+
+    count, _ = process_files(str(list_path), str(tmp_path / "bundle.md"), prober, jobs=8)
+
+    assert count == 16
+    assert (prober.files, prober.cache_hits) == (16, 15)
+
+def test_stdout_bundle_keeps_logs_out(tmp_path, monkeypatch, capfd):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.ts").write_text("const a = 1\n")
+    list_path = write_list(tmp_path, ["a.ts"])
+
+    process_files(str(list_path), '-')
+    out, err = capfd.readouterr()
+    process_files(str(list_path), str(tmp_path / "bundle.md"))
+
+    assert out == (tmp_path / "bundle.md").read_text(encoding='utf-8')
+    assert "Processing" in err
+
+@pytest.mark.parametrize('index', [None, 'trailer'])
+def test_incremental_rebuild_matches_fresh_build(tmp_path, monkeypatch, index):
+    sources = [tmp_path / name for name in ("a.ts", "b.ts", "c.ts", "d.ts")]
+    for source in sources[:3]:
+        source.write_text(f"export const name = '{source.name}'\n" * 50, encoding='utf-8')
+    list_path = str(write_list(tmp_path, sources[:3]))
+    output = str(tmp_path / "bundle.md")
+    log = StringIO()
+    monkeypatch.setattr(assemble_code_files, 'log_stream', log)
+
+    process_files(list_path, output, incremental=True, index=index)
+    sources[1].write_text("export const name = 'changed'\n", encoding='utf-8')
+    sources[2].unlink()
+    sources[3].write_text("export const added = true\n", encoding='utf-8')
+    list_path = str(write_list(tmp_path, [sources[0], sources[1], sources[3]]))
+    process_files(list_path, output, incremental=True, index=index)
+    process_files(list_path, str(tmp_path / "fresh.md"), index=index)
+
+    assert "reused 1 unchanged blocks" in log.getvalue()
+    bundle = (tmp_path / "bundle.md").read_bytes()
+    assert bundle == (tmp_path / "fresh.md").read_bytes()
+    with open(manifest_path_for(output), encoding='utf-8') as f:
+        blocks = json.load(f)['blocks']
+    assert [block['path'] for block in blocks] == [str(sources[0]), str(sources[1]), str(sources[3])]
+    for block, source in zip(blocks, [sources[0], sources[1], sources[3]]):
+        data = bundle[block['offset']:block['offset'] + block['length']]
+        assert data == (block_header(block['path']).encode('utf-8') + source.read_bytes()
+                        + BLOCK_FOOTER.encode('utf-8'))
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_parallel_bundle_matches_serial(tmp_path, monkeypatch, streaming):
+    """--jobs N must write the same bundle bytes, in the same order, as the serial run"""
+    monkeypatch.setattr(assemble_code_files, 'log_stream', StringIO())
+    sources = []
+    for index in range(40):
+        source = tmp_path / f"file{index:02d}.ts"
+        # Sizes vary so later files can finish before earlier ones.
+        source.write_text(f"export const value{index} = 'café'\n" * (7919 * index % 3000 + 1),
+                          encoding='utf-8')
+        sources.append(source)
+    (tmp_path / "legacy.md").write_bytes("Clinique médicale\n".encode('latin-1') * 100)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\0\0")
+    sources[5:5] = [tmp_path / "legacy.md", tmp_path / "logo.png", tmp_path / "missing.ts"]
+    list_path = str(write_list(tmp_path, sources))
+
+    serial = process_files(list_path, str(tmp_path / "serial.md"), streaming=streaming)
+    parallel = process_files(list_path, str(tmp_path / "parallel.md"), jobs=8,
+                             streaming=streaming)
+
+    assert parallel == serial
+    assert serial[0] == 41
+    assert (tmp_path / "parallel.md").read_bytes() == (tmp_path / "serial.md").read_bytes()
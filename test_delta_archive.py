@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for creating and applying delta archives in delta_archive.py
+"""
+
+import os
+import zipfile
+
+import delta_archive
+from archive_engine import build_archive
+from delta_archive import DELTA_MANIFEST_NAME, apply_delta, create_delta
+from snapshot_store import SnapshotStore
+from tests_helpers import make_tree, quietly, read_members
+
+def read_tree(root):
+    tree = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                tree[os.path.relpath(path, root).replace(os.sep, '/')] = f.read()
+    return tree
+
+def test_apply_matches_fresh_build(tmp_path, monkeypatch):
+    root = tmp_path / "src"
+    make_tree(root)
+    base = str(tmp_path / "base.zip")
+    quietly(build_archive, str(root), base, 'full')
+
+    (root / "app" / "page.tsx").write_text("export default function Page() { return null }\n")
+    (root / "lib" / "format.ts").write_text("export const format = (x) => x\n")
+    (root / "app" / "layout.tsx").unlink()
+    (root / "lib" / "utils.ts").write_text("export const clinic = 'Gabrial'\n")
+
+    scan_profile = delta_archive.scan_profile
+    def scan_with_unreadable_file(*args, **kwargs):
+        # lib/utils.ts vanishes between the scan and compression.
+        return [entry._replace(path=entry.path + '.missing') if entry.arcname == 'lib/utils.ts'
+                else entry for entry in scan_profile(*args, **kwargs)]
+    monkeypatch.setattr(delta_archive, 'scan_profile', scan_with_unreadable_file)
+    delta = str(tmp_path / "delta.zip")
+    manifest = quietly(create_delta, str(root), base, delta, 'full')
+
+    assert (manifest['added'], manifest['modified'], manifest['deleted']) == \
+        (['lib/format.ts'], ['app/page.tsx'], ['app/layout.tsx'])
+    fresh = str(tmp_path / "fresh.zip")
+    quietly(build_archive, str(root), fresh, 'full')
+    expected = read_members(fresh)
+    expected['lib/utils.ts'] = read_members(base)['lib/utils.ts']
+
+    quietly(apply_delta, delta, str(tmp_path / "tree"), base)
+    assert read_tree(tmp_path / "tree") == expected
+
+    rebuilt = str(tmp_path / "rebuilt.zip")
+    quietly(apply_delta, delta, rebuilt, base)
+    assert read_members(rebuilt) == expected
+    with zipfile.ZipFile(rebuilt) as zipf:
+        assert DELTA_MANIFEST_NAME not in zipf.namelist()
+
+def test_prefixed_delta_against_snapshot_manifest(tmp_path):
+    root = tmp_path / "src"
+    make_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+    quietly(store.take, 'base', str(root))
+    base = store.manifest_path('base')
+
+    manifest = quietly(create_delta, str(root), base, str(tmp_path / "same.zip"), 'full',
+                       'clinic/')
+    assert (manifest['added'], manifest['modified'], manifest['deleted']) == ([], [], [])
+
+    (root / "app" / "page.tsx").write_text("export default function Page() { return null }\n")
+    (root / "app" / "layout.tsx").unlink()
+    delta = str(tmp_path / "delta.zip")
+    manifest = quietly(create_delta, str(root), base, delta, 'full', 'clinic/')
+    assert (manifest['added'], manifest['modified'], manifest['deleted']) == \
+        ([], ['clinic/app/page.tsx'], ['clinic/app/layout.tsx'])
+    with zipfile.ZipFile(delta) as zipf:
+        assert sorted(zipf.namelist()) == [DELTA_MANIFEST_NAME, 'clinic/app/page.tsx']
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the streaming extractor in extract_code_files.py
+
+The expected trees and reports are those of the readlines()-based
+extractor it replaced.
+"""
+
+import os
+import sys
+import zipfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import assemble_code_files
+import extract_code_files
+from assemble_code_files import process_files
+from extract_code_files import (ArchiveWriter, extract_files, extract_selected, read_bundle_index,
+                                select_index_entries)
+
+CASES = {
+    'crlf': (
+        b"```ts\r\n// a/crlf.ts\r\nconst a = 1\r\n\r\nconst b = 2\r\n```\r\n",
+        (1, 1, [], []),
+        {'a/crlf.ts': b"// a/crlf.ts\nconst a = 1\n\nconst b = 2\n"},
+    ),
+    'lone-cr': (
+        b"```ts\r// a/cr.ts\rconst a = 1\rconst b = 2\r```\r",
+        (1, 1, [], []),
+        {'a/cr.ts': b"// a/cr.ts\nconst a = 1\nconst b = 2\n"},
+    ),
+    'mixed-line-endings': (
+        b"```ts\n// a/mixed.ts\nx = 1\r\ny = 2\rz = 3\n```\n",
+        (1, 1, [], []),
+        {'a/mixed.ts': b"// a/mixed.ts\nx = 1\ny = 2\nz = 3\n"},
+    ),
+    'trailing-blank-lines': (
+        b"```ts\n// a/t.ts\nconst a = 1\n\n\n\n```\n",
+        (1, 1, [], []),
+        {'a/t.ts': b"// a/t.ts\nconst a = 1\n"},
+    ),
+    'inner-blank-lines': (
+        b"```ts\n// a/b.ts\n\nconst a = 1\n\n\nconst b = 2\n```\n",
+        (1, 1, [], []),
+        {'a/b.ts': b"// a/b.ts\n\nconst a = 1\n\n\nconst b = 2\n"},
+    ),
+    'unclosed-block': (
+        b"```ts\n// a/ok.ts\nok\n```\n```ts\n// a/cut.ts\nconst a = 1\n",
+        (2, 1, [('a/cut.ts', "Missing closing code fence")], []),
+        {'a/ok.ts': b"// a/ok.ts\nok\n"},
+    ),
+    'missing-filename-marker': (
+        b"```ts\nconst a = 1\n```\n```ts\n// a/after.ts\nafter\n```\n",
+        (2, 1, [('<unknown>', "Expected a file marker comment after code fence")], []),
+        {'a/after.ts': b"// a/after.ts\nafter\n"},
+    ),
+    'empty-filename-marker': (
+        b"```ts\n//   \nconst a = 1\n```\n",
+        (1, 0, [('<unknown>', "Empty filename in file marker")], []),
+        {},
+    ),
+    'duplicate-filename': (
+        b"```ts\n// a/d.ts\none\n```\n\n```ts\n// a/d.ts\ntwo\n```\n",
+        (2, 2, [], ['a/d.ts']),
+        {'a/d.ts': b"// a/d.ts\ntwo\n"},
+    ),
+    'no-final-newline': (
+        b"```python\n# File: pkg/m.py\nprint(1)\n```",
+        (1, 1, [], []),
+        {'pkg/m.py': b"# File: pkg/m.py\nprint(1)\n"},
+    ),
+}
+
+# Sources for the index round trip; the assembler reads them with universal
+# newlines, so the CRLF file comes back with LF endings.
+INDEXED_SOURCES = {
+    'crlf.ts': b"const a = 1\r\n\r\nconst b = 2\r\n",
+    'lib/no-final-newline.py': b"print(1)",
+    'lib/utils.ts': b"export const clinic = 'Gabriel'\n",
+    'app/page.tsx': b"export default function Page() {}\n",
+}
+
+def extracted_tree(root):
+    tree = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            if rel != 'bundle.md':
+                with open(path, 'rb') as f:
+                    tree[rel] = f.read()
+    return tree
+
+@pytest.mark.parametrize('jobs', [1, 2])
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_extraction_matches_previous_implementation(tmp_path, monkeypatch, name, jobs):
+    bundle, report, tree = CASES[name]
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bundle.md").write_bytes(bundle)
+
+    with redirect_stdout(StringIO()):
+        result = extract_files("bundle.md", 'utf-8', jobs=jobs)
+
+    assert result == report
+    assert extracted_tree(tmp_path) == tree
+
+def test_archive_keeps_only_the_last_block_per_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bundle.md").write_bytes(
+        b"```ts\n// a/d.ts\none\n```\n```ts\n// a/e.ts\ne\n```\n"
+        b"```ts\n// a/d.ts\ntwo\n```\n```ts\n// a/d.ts\ncut\n")
+
+    with redirect_stdout(StringIO()):
+        archive = ArchiveWriter(str(tmp_path / "out.zip"))
+        result = extract_files("bundle.md", 'utf-8', archive=archive)
+
+    assert result == (4, 3, [('a/d.ts', "Missing closing code fence")], ['a/d.ts'])
+    with zipfile.ZipFile(tmp_path / "out.zip") as zipf:
+        assert zipf.namelist() == ['a/e.ts', 'a/d.ts']
+        assert zipf.read('a/d.ts') == b"// a/d.ts\ntwo\n"
+
+def test_skip_unchanged_compares_only_the_last_block(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bundle.md").write_bytes(
+        b"```ts\n// a/d.ts\none\n```\n```ts\n// a/d.ts\ntwo\n```\n")
+    (tmp_path / "a").mkdir()
+    target = tmp_path / "a" / "d.ts"
+    target.write_bytes(b"// a/d.ts\ntwo\n")
+    os.utime(target, (1000000000, 1000000000))
+    stats = {'new': 0, 'written': 0, 'unchanged': 0}
+
+    with redirect_stdout(StringIO()):
+        result = extract_files("bundle.md", 'utf-8', skip_unchanged=True, stats=stats)
+
+    assert result == (2, 2, [], ['a/d.ts'])
+    assert stats == {'new': 0, 'written': 0, 'unchanged': 1}
+    assert target.stat().st_mtime == 1000000000
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_skip_unchanged_leaves_the_directory_alone(tmp_path, monkeypatch, jobs):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bundle.md").write_bytes(
+        b"```ts\n// a/d.ts\ntwo\n```\n```ts\n// a/e.ts\nnew\n```\n")
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "d.ts").write_bytes(b"// a/d.ts\ntwo\n")
+    (tmp_path / "a" / "e.ts").write_bytes(b"// a/e.ts\nold\n")
+    created = []
+    real_open = open
+    def recording_open(file, mode='r', *args, **kwargs):
+        if 'w' in mode:
+            created.append(os.path.relpath(file, tmp_path))
+        return real_open(file, mode, *args, **kwargs)
+    monkeypatch.setattr('builtins.open', recording_open)
+    stats = {'new': 0, 'written': 0, 'unchanged': 0}
+
+    with redirect_stdout(StringIO()):
+        extract_files("bundle.md", 'utf-8', jobs=jobs, skip_unchanged=True, stats=stats)
+
+    assert stats == {'new': 0, 'written': 1, 'unchanged': 1}
+    assert created == [os.path.join('a', '.e.ts.extract-tmp')]
+    assert (tmp_path / "a" / "e.ts").read_bytes() == b"// a/e.ts\nnew\n"
+
+def test_failed_extraction_leaves_no_temporary_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bundle.md").write_bytes(b"```ts\n// a/d.ts\none\ntwo\n```\n")
+    def failing_lines(path, encoding):
+        yield "```ts"
+        yield "// a/d.ts"
+        raise UnicodeDecodeError('utf-8', b"\xff", 0, 1, "invalid start byte")
+    monkeypatch.setattr(extract_code_files, 'iter_bundle_lines', failing_lines)
+
+    with redirect_stdout(StringIO()), pytest.raises(SystemExit):
+        extract_files("bundle.md", 'utf-8')
+
+    assert os.listdir(tmp_path / "a") == []
+
+@pytest.mark.parametrize('index', ['trailer', 'sidecar'])
+def test_select_round_trips_through_the_index(tmp_path, monkeypatch, index):
+    source_root = tmp_path / "src"
+    for path, data in INDEXED_SOURCES.items():
+        (source_root / path).parent.mkdir(parents=True, exist_ok=True)
+        (source_root / path).write_bytes(data)
+    (tmp_path / "files.txt").write_text("\n".join(INDEXED_SOURCES) + "\n")
+    monkeypatch.chdir(source_root)
+    monkeypatch.setattr(assemble_code_files, 'log_stream', StringIO())
+    process_files(str(tmp_path / "files.txt"), str(tmp_path / "bundle.md"), index=index)
+
+    entries = read_bundle_index(str(tmp_path / "bundle.md"))
+    assert [path for path, _, _ in entries] == list(INDEXED_SOURCES)
+    selected = select_index_entries(entries, ['crlf.ts', 'lib/*'])
+    out = tmp_path / "out"
+    out.mkdir()
+    monkeypatch.chdir(out)
+    with redirect_stdout(StringIO()):
+        result = extract_selected(str(tmp_path / "bundle.md"), selected)
+
+    assert result == (3, 3, [], [])
+    assert extracted_tree(out) == {path: data.replace(b"\r\n", b"\n")
+                                   for path, data in INDEXED_SOURCES.items()
+                                   if path != 'app/page.tsx'}
+
+@pytest.mark.parametrize('index', ['trailer', 'sidecar'])
+def test_index_of_a_bundle_edited_in_place_is_not_trusted(tmp_path, monkeypatch, index):
+    sources = {'lib/utils.ts': b"// lib/utils.ts\nexport const clinic = 'Gabriel'\n",
+               'app/page.tsx': b"// app/page.tsx\nexport default function Page() {}\n"}
+    for path, data in sources.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(data)
+    (tmp_path / "files.txt").write_text("\n".join(sources) + "\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(assemble_code_files, 'log_stream', StringIO())
+    bundle = tmp_path / "bundle.md"
+    process_files("files.txt", str(bundle), index=index)
+    assert read_bundle_index(str(bundle)) is not None
+
+    # Same length, same mtime: only the leading bytes tell the edit apart.
+    st = bundle.stat()
+    bundle.write_bytes(bundle.read_bytes().replace(b"'Gabriel'", b"'Gabrial'"))
+    os.utime(bundle, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert read_bundle_index(str(bundle)) is None
+
+    out = tmp_path / "out"
+    out.mkdir()
+    monkeypatch.chdir(out)
+    monkeypatch.setattr(sys, 'argv', ['extract_code_files.py', str(bundle), '--select', 'lib/*'])
+    output = StringIO()
+    with redirect_stdout(output):
+        extract_code_files.main()
+
+    assert "no valid index" in output.getvalue()
+    assert extracted_tree(out) == {
+        'lib/utils.ts': b"// lib/utils.ts\nexport const clinic = 'Gabrial'\n"}
+
+def test_sidecar_is_not_trusted_after_the_bundle_is_touched(tmp_path, monkeypatch):
+    (tmp_path / "a.ts").write_text("// a.ts\nconst a = 1\n")
+    (tmp_path / "files.txt").write_text("a.ts\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(assemble_code_files, 'log_stream', StringIO())
+    process_files("files.txt", "bundle.md", index='sidecar')
+    os.utime("bundle.md", (1000000000, 1000000000))
+
+    with redirect_stdout(StringIO()):
+        assert read_bundle_index("bundle.md") is None
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for exact and near-duplicate document clustering in near_duplicates.py
+"""
+
+import random
+
+from near_duplicates import duplicate_paths, find_duplicates, jaccard, shingle_hashes
+
+def words(count, seed):
+    rng = random.Random(seed)
+    return [f"word{rng.randrange(100000)}" for _ in range(count)]
+
+def write_doc(path, words):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(' '.join(words) + '\n')
+    return str(path)
+
+def test_exact_duplicates_keep_shortest_path(tmp_path):
+    text = words(200, 1)
+    nested = write_doc(tmp_path / "docs" / "archive" / "guide.md", text)
+    top = write_doc(tmp_path / "guide.md", text)
+    other = write_doc(tmp_path / "other.md", words(200, 2))
+
+    clusters = find_duplicates([nested, top, other], 'exact')
+
+    assert len(clusters) == 1
+    assert clusters[0].keep == top
+    assert clusters[0].drop == [nested]
+    assert clusters[0].exact
+    assert clusters[0].saved == (tmp_path / "guide.md").stat().st_size
+
+def test_near_duplicates_keep_largest(tmp_path):
+    text = words(300, 3)
+    original = write_doc(tmp_path / "DEPLOYMENT.md", text)
+    revised = write_doc(tmp_path / "DEPLOYMENT_v2.md", text + ['updated', 'for', 'vercel'])
+    assert jaccard(shingle_hashes(' '.join(text)),
+                   shingle_hashes(' '.join(text + ['updated', 'for', 'vercel']))) > 0.95
+
+    assert find_duplicates([original, revised], 'exact') == []
+    clusters = find_duplicates([original, revised], 'near')
+
+    assert len(clusters) == 1
+    assert clusters[0].keep == revised
+    assert clusters[0].drop == [original]
+    assert not clusters[0].exact
+    assert clusters[0].saved == (tmp_path / "DEPLOYMENT.md").stat().st_size
+
+def test_pair_below_threshold_is_not_clustered(tmp_path):
+    text = words(300, 4)
+    first = write_doc(tmp_path / "a.md", text)
+    # Every other word replaced: no shingle is shared.
+    second = write_doc(tmp_path / "b.md", [word if index % 2 else 'changed'
+                                           for index, word in enumerate(text)])
+    half = write_doc(tmp_path / "c.md", text[:150] + words(150, 5))
+    assert 0.3 < jaccard(shingle_hashes(' '.join(text)),
+                         shingle_hashes(' '.join(text[:150] + words(150, 5)))) < 0.8
+
+    assert find_duplicates([first, second, half], 'near') == []
+
+def test_duplicate_paths_reports_bytes_saved(tmp_path):
+    text = words(200, 6)
+    keep = write_doc(tmp_path / "README.md", text)
+    copies = [write_doc(tmp_path / name, text) for name in ("README_v1.md", "README_old.md")]
+    source = tmp_path / "page.tsx"
+    source.write_text(' '.join(text))
+
+    dropped, saved, clusters = duplicate_paths([keep, str(source)] + copies)
+
+    assert dropped == set(copies)
+    assert saved == 2 * (tmp_path / "README.md").stat().st_size
+    assert [cluster.keep for cluster in clusters] == [keep]
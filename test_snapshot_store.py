@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for taking, comparing and restoring snapshots in snapshot_store.py
+"""
+
+import os
+import stat
+import zipfile
+
+import pytest
+
+from snapshot_store import (SnapshotStore, diff_manifests, export_zip, materialize,
+                            print_snapshot_list)
+from tests_helpers import make_tree, quietly, read_members
+
+def make_snapshot_tree(root):
+    make_tree(root)
+    deploy = root / "deploy.sh"
+    deploy.write_text("#!/bin/sh\nnpm run build\n")
+    deploy.chmod(0o755)
+    os.utime(root / "lib" / "utils.ts", (1700000000, 1700000000))
+
+def test_take_stores_unchanged_blobs_once(tmp_path, capsys):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+
+    manifest, new_blobs, _ = quietly(store.take, 'v1', str(root))
+    assert sorted(manifest['files']) == ['app/layout.tsx', 'app/page.tsx', 'deploy.sh',
+                                         'lib/utils.ts', 'public/logo.png']
+    assert new_blobs == 5
+    assert quietly(store.take, 'v2', str(root))[1:] == (0, 0)
+    assert store.snapshot_names() == ['v1', 'v2']
+    print_snapshot_list(store)
+    assert "2 snapshots" in capsys.readouterr().out
+
+def test_diff_classifies_changes(tmp_path):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+    quietly(store.take, 'v1', str(root))
+    (root / "app" / "page.tsx").write_text("export default function Page() { return null }\n")
+    (root / "app" / "layout.tsx").unlink()
+    (root / "lib" / "format.ts").write_text("export const format = (x) => x\n")
+    quietly(store.take, 'v2', str(root))
+
+    assert diff_manifests(store.load('v1'), store.load('v2')) == \
+        (['lib/format.ts'], ['app/layout.tsx'], ['app/page.tsx'])
+
+def test_materialize_restores_content_mode_and_mtime(tmp_path):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+    quietly(store.take, 'v1', str(root))
+
+    dest = tmp_path / "restored"
+    quietly(materialize, store, 'v1', str(dest))
+
+    for path in ['app/page.tsx', 'deploy.sh', 'lib/utils.ts', 'public/logo.png']:
+        assert (dest / path).read_bytes() == (root / path).read_bytes()
+        assert stat.S_IMODE((dest / path).stat().st_mode) == \
+            stat.S_IMODE((root / path).stat().st_mode)
+    assert os.access(dest / "deploy.sh", os.X_OK)
+    assert (dest / "lib" / "utils.ts").stat().st_mtime == 1700000000
+
+def test_export_round_trips_through_a_zip(tmp_path):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+    quietly(store.take, 'v1', str(root))
+
+    exported = str(tmp_path / "v1.zip")
+    quietly(export_zip, store, 'v1', exported)
+    members = read_members(exported)
+    assert members['deploy.sh'] == (root / "deploy.sh").read_bytes()
+    with zipfile.ZipFile(exported) as zipf:
+        assert stat.S_IMODE(zipf.getinfo('deploy.sh').external_attr >> 16) == 0o755
+        assert stat.S_IMODE(zipf.getinfo('app/page.tsx').external_attr >> 16) == 0o644
+
+    manifest, new_blobs, _ = quietly(store.take, 'from-zip', exported)
+    assert new_blobs == 0
+    assert manifest['files']['deploy.sh']['mode'] == 0o755
+    assert diff_manifests(store.load('v1'), manifest) == ([], [], [])
+
+@pytest.mark.parametrize('name', ['', '../escape', 'nested/name', '..'])
+def test_take_rejects_path_like_names(tmp_path, name):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    store = SnapshotStore(str(tmp_path / "store"))
+
+    with pytest.raises(SystemExit):
+        quietly(store.take, name, str(root))
+    assert not (tmp_path / "store").exists()
+
+def test_store_inside_the_tree_is_not_snapshotted(tmp_path, monkeypatch):
+    root = tmp_path / "src"
+    make_snapshot_tree(root)
+    monkeypatch.chdir(root)
+    store = SnapshotStore()
+
+    first, new_blobs, _ = quietly(store.take, 's1', '.')
+    second, second_blobs, _ = quietly(store.take, 's2', '.')
+
+    assert new_blobs == 5
+    assert second_blobs == 0
+    assert not any(path.startswith('.snapshots/') for path in second['files'])
+    assert diff_manifests(first, second) == ([], [], [])
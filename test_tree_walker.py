@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled ignore matcher and the tree walk in tree_walker.py
+"""
+
+import os
+
+import pytest
+
+import tree_walker
+from bench_ignore_rules import is_ignored_by_loop, synthetic_paths
+from tree_walker import IgnoreRules, walk_files
+
+GIT_RULES = [
+    '*.log',
+    '!keep.log',
+    'build/',
+    '/out',
+    'docs/*.md',
+    '**/fixtures/**',
+    'a/**/z.ts',
+    '*.test.*',
+    '!lib/*.test.ts',
+]
+
+def rules_for(patterns, docker=False):
+    rules = IgnoreRules('.')
+    for pattern in patterns:
+        rules.add(pattern, docker)
+    return rules
+
+@pytest.mark.parametrize('rel_path, is_dir, ignored', [
+    # Negation: the last matching rule wins.
+    ('logs/debug.log', False, True),
+    ('logs/keep.log', False, False),
+    ('lib/utils.test.ts', False, False),
+    ('app/page.test.tsx', False, True),
+    # Dir-only rules never match files.
+    ('build', True, True),
+    ('src/build', True, True),
+    ('build', False, False),
+    # A leading or inner '/' anchors the rule at the root.
+    ('out', True, True),
+    ('out', False, True),
+    ('app/out', True, False),
+    ('docs/README.md', False, True),
+    ('design-system/docs/README.md', False, False),
+    # '**' spans any number of directories.
+    ('tests/fixtures/data/x.json', False, True),
+    ('fixtures/x.json', False, True),
+    ('a/z.ts', False, True),
+    ('a/b/c/z.ts', False, True),
+    ('b/a/z.ts', False, False),
+])
+def test_gitignore_semantics(rel_path, is_dir, ignored):
+    rules = rules_for(GIT_RULES)
+    assert rules.is_ignored(rel_path, is_dir) is ignored
+    assert is_ignored_by_loop(rules, rel_path, is_dir) is ignored
+
+@pytest.mark.parametrize('rel_path, is_dir, ignored', [
+    ('README.md', False, True),
+    ('design-system/docs/README.md', False, False),
+    ('lib/utils.test.ts', False, False),
+    ('utils.test.ts', False, True),
+    ('tests', True, True),
+    ('tests', False, True),
+    ('app/tests', True, False),
+    ('supabase/migrations', True, True),
+    ('docs/deep/notes.md', False, True),
+    ('notes/CHANGES.md', False, True),
+])
+def test_dockerignore_is_anchored_at_root(rel_path, is_dir, ignored):
+    rules = rules_for(['*.md', '*.test.*', 'tests/', 'supabase/migrations/', '**/CHANGES.md',
+                       'docs/**'], docker=True)
+    assert rules.is_ignored(rel_path, is_dir) is ignored
+    assert is_ignored_by_loop(rules, rel_path, is_dir) is ignored
+
+def test_compiled_matches_rule_loop_on_project_rules():
+    rules = IgnoreRules.from_files('.', ('.gitignore', '.dockerignore'))
+    rules.add('!docs/keep.md')
+    rules.add('**/fixtures/**')
+    for rel_path, is_dir in synthetic_paths(20000):
+        assert rules.is_ignored(rel_path, is_dir) == is_ignored_by_loop(rules, rel_path, is_dir), rel_path
+
+def test_walk_prunes_ignored_directories(tmp_path, monkeypatch):
+    (tmp_path / ".gitignore").write_text("build/\n*.log\n")
+    for rel_path in ["app/page.tsx", "app/debug.log", "build/out.js", "build/deep/chunk.js",
+                     "node_modules/react/index.js", "app/node_modules/x/index.js"]:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text("x\n")
+    scanned = []
+    scandir = os.scandir
+    def recording_scandir(path):
+        scanned.append(os.path.relpath(path, tmp_path).replace(os.sep, '/'))
+        return scandir(path)
+    monkeypatch.setattr(tree_walker.os, 'scandir', recording_scandir)
+    rules = IgnoreRules.from_files(str(tmp_path), ('.gitignore',))
+
+    files = [os.path.relpath(path, tmp_path) for path in walk_files(str(tmp_path), rules)]
+
+    assert files == ['.gitignore', os.path.join('app', 'page.tsx')]
+    assert scanned == ['.', 'app']
+    # build, node_modules, app/debug.log and app/node_modules
+    assert rules.pruned == 4
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the archive, delta and snapshot tests
+"""
+
+import os
+import zipfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+def make_tree(root):
+    (root / "app").mkdir(parents=True)
+    (root / "app" / "page.tsx").write_text("export default function Page() {}\n" * 200)
+    (root / "app" / "layout.tsx").write_text("export const metadata = {}\n" * 50)
+    (root / "lib").mkdir()
+    (root / "lib" / "utils.ts").write_text("export const clinic = 'Gabriel'\n" * 100)
+    (root / "public").mkdir()
+    (root / "public" / "logo.png").write_bytes(os.urandom(4096))
+
+def read_members(path):
+    with zipfile.ZipFile(path) as zipf:
+        assert zipf.testzip() is None
+        return {info.filename: zipf.read(info) for info in zipf.infolist()}
+
+def quietly(function, *args, **kwargs):
+    with redirect_stdout(StringIO()):
+        return function(*args, **kwargs)
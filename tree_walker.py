@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Ignore-aware directory walking shared by the bundle and archive scripts.
+
+Directories are pruned before they are descended into, so nothing below
+node_modules, .next, dist or an ignore-file rule is ever listed.
+"""
+import os
+import re
+
+# Directories that are never descended into, whatever the ignore files say.
+DEFAULT_IGNORED_DIRS = frozenset(['node_modules', '.next', 'dist', '.git'])
+# Ignore files read from the project root by default. .dockerignore describes
+# the Docker build context, not the project, so it is only read on request.
+DEFAULT_IGNORE_FILES = ('.gitignore',)
+
+GLOB_MAGIC = re.compile(r'[*?[]')
+
+def has_glob_magic(pattern):
+    """Return True if pattern contains glob wildcards."""
+    return GLOB_MAGIC.search(pattern) is not None
+
+def translate_glob(pattern):
+    """
+    Translate a slash-separated glob into a regex fragment (no anchors).
+
+    '*' and '?' never cross a '/', '**/' matches any number of leading
+    directories and a trailing '/**' matches everything below a directory.
+    """
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == n:
+            parts.append('(?:/.*)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif c == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif c == '?':
+            parts.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return ''.join(parts)
+
+class IgnoreRule:
+    """
+    One ignore-file line, matched against root-relative posix paths.
+
+    With docker=True the line follows .dockerignore semantics: every pattern
+    is anchored at the root (so '*.md' only matches top-level files) and a
+    trailing '/' is dropped rather than restricting the rule to directories.
+    """
+
+    def __init__(self, pattern, docker=False):
+        self.pattern = pattern
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/') and not docker
+        pattern = pattern.rstrip('/')
+        # A slash anywhere but the end anchors the rule to the root.
+        self.anchored = docker or '/' in pattern
+        pattern = pattern.lstrip('/')
+        self.body = translate_glob(pattern)
+        # An unanchored rule without '**' can only match the last component.
+        self.basename_only = not self.anchored and '**' not in pattern
+        prefix = '^' if self.anchored else '^(?:.*/)?'
+        self.regex = re.compile(prefix + self.body + '$')
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+def compile_rules(rules):
+    """
+    Compile rules into one regex whose lastgroup names the winning rule.
+
+    The subject is 'basename NUL path' (see IgnoreRules.is_ignored), so rules
+    that can only match the last component are tried against the basename
+    without backtracking over the directories. Alternatives are tried left
+    to right, so the rules are emitted in reverse order: the first one that
+    matches is the last matching rule, which wins in gitignore semantics.
+    Groups are named 'i<n>' for ignoring rules and 'n<n>' for '!' rules.
+    Returns None for no rules.
+    """
+    alternatives = []
+    for index in range(len(rules) - 1, -1, -1):
+        rule = rules[index]
+        name = ('n' if rule.negated else 'i') + str(index)
+        if rule.basename_only:
+            alternatives.append(f'(?P<{name}>{rule.body})\x00')
+        elif not rule.anchored:
+            alternatives.append(f'[^\x00]*\x00(?:.*/)?(?P<{name}>{rule.body})$')
+        else:
+            alternatives.append(f'[^\x00]*\x00(?P<{name}>{rule.body})$')
+    if not alternatives:
+        return None
+    return re.compile('(?:' + '|'.join(alternatives) + ')')
+
+class IgnoreRules:
+    """
+    Ordered gitignore/dockerignore rules plus a set of always-ignored names.
+
+    As in git, the last matching rule wins, so a later '!pattern' re-includes
+    a path an earlier rule excluded. The rules are compiled into one regex
+    for files and one for directories, so each path costs a single match
+    instead of one per rule. pruned counts the paths walk_files left out.
+    """
+
+    def __init__(self, root='.', patterns=(), ignored_dirs=DEFAULT_IGNORED_DIRS):
+        self.root = root
+        self.ignored_dirs = frozenset(ignored_dirs)
+        self.rules = []
+        self._file_regex = None
+        self._dir_regex = None
+        self._compiled = False
+        self.pruned = 0
+        for pattern in patterns:
+            self.add(pattern)
+
+    @classmethod
+    def from_files(cls, root='.', names=DEFAULT_IGNORE_FILES, ignored_dirs=DEFAULT_IGNORED_DIRS):
+        """
+        Load rules from the named ignore files under root; missing files are
+        skipped. Files named .dockerignore are parsed with Docker semantics.
+        """
+        rules = cls(root, ignored_dirs=ignored_dirs)
+        for name in names:
+            docker = os.path.basename(name) == '.dockerignore'
+            try:
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        rules.add(line, docker)
+            except OSError:
+                continue
+        return rules
+
+    def add(self, line, docker=False):
+        pattern = line.rstrip('\r\n').rstrip()
+        if not pattern or pattern.startswith('#'):
+            return
+        self.rules.append(IgnoreRule(pattern, docker))
+        self._compiled = False
+
+    def compile(self):
+        """(Re)build the combined regexes; called lazily after rules change."""
+        self._file_regex = compile_rules([rule for rule in self.rules if not rule.dir_only])
+        self._dir_regex = compile_rules(self.rules)
+        self._compiled = True
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """Return True if the root-relative posix path is ignored."""
+        if is_dir and rel_path.rsplit('/', 1)[-1] in self.ignored_dirs:
+            return True
+        if not self._compiled:
+            self.compile()
+        regex = self._dir_regex if is_dir else self._file_regex
+        if regex is None:
+            return False
+        basename = rel_path.rsplit('/', 1)[-1]
+        match = regex.match(basename + '\x00' + rel_path)
+        return match is not None and match.lastgroup[0] == 'i'
+
+    def relative(self, path):
+        """Return path relative to the rules root in posix form ('' for the root)."""
+        rel = os.path.relpath(path, self.root)
+        if rel == '.':
+            return ''
+        return rel.replace(os.sep, '/')
+
+def walk_files(root, rules=None, max_depth=None):
+    """
+    Yield the files below root lazily, in sorted order per directory.
+
+    Ignored directories are pruned before descending. root itself is never
+    subject to the rules: naming a directory explicitly includes it.
+    Symlinked directories are not followed. max_depth limits how many
+    directory levels below root are entered (None for no limit).
+    """
+    if rules is None:
+        rules = IgnoreRules()
+    rel_root = rules.relative(root)
+    stack = [(root, rel_root, 0)]
+    while stack:
+        directory, rel_dir, depth = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel_path = rel_dir + '/' + entry.name if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if rules.is_ignored(rel_path, is_dir):
+                rules.pruned += 1
+                continue
+            # Keep paths under '.' free of a leading './'.
+            path = entry.name if directory == '.' else entry.path
+            if is_dir:
+                if max_depth is None or depth < max_depth:
+                    subdirs.append((path, rel_path, depth + 1))
+            elif entry.is_file():
+                yield path
+        # Reversed so the first subdirectory is walked first.
+        stack.extend(reversed(subdirs))
+
+def expand_glob(pattern, rules=None):
+    """
+    Yield files matching a glob such as 'app/**/*.tsx', walking only the
+    literal base directory of the pattern and pruning ignored directories.
+    """
+    parts = pattern.replace(os.sep, '/').split('/')
+    base_parts = []
+    for part in parts:
+        if has_glob_magic(part):
+            break
+        base_parts.append(part)
+    rest = '/'.join(parts[len(base_parts):])
+    base = '/'.join(base_parts) or '.'
+    if pattern.startswith('/') and not base_parts[1:]:
+        base = '/'
+    regex = re.compile(translate_glob(rest) + '$')
+    max_depth = None if '**' in rest else rest.count('/')
+    prefix_len = 0 if base == '.' else len(base.rstrip('/')) + 1
+    for path in walk_files(base, rules, max_depth):
+        if regex.match(path[prefix_len:].replace(os.sep, '/')):
+            yield path
+
+def iter_input_paths(entries, rules=None):
+    """
+    Expand a sequence of paths, directories and glob patterns lazily.
+
+    Plain file paths are passed through untouched (even if missing, so the
+    caller can report them); directories are walked and globs expanded with
+    ignore pruning. Files reached through more than one entry are yielded once.
+    """
+    seen = set()
+    for entry in entries:
+        if has_glob_magic(entry):
+            paths = expand_glob(entry, rules)
+        elif os.path.isdir(entry):
+            paths = walk_files(entry, rules)
+        else:
+            seen.add(os.path.normpath(entry))
+            yield entry
+            continue
+        for path in paths:
+            key = os.path.normpath(path)
+            if key not in seen:
+                seen.add(key)
+                yield path